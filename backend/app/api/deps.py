@@ -1,16 +1,22 @@
+import hashlib
+import time
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Any, Optional, List, Dict, Tuple
 
 from app.core.config import settings
+from app.core.metrics import TOKEN_CACHE_LOOKUPS
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/login/token")
 
 class TokenData(BaseModel):
     id: Optional[str] = None
     role: Optional[str] = None
+    name: Optional[str] = None
+    class_info: Optional[Dict[str, Any]] = Field(None, alias='class')
     can_manage_admins: Optional[bool] = None
     can_manage_classes: Optional[bool] = None
     can_manage_students: Optional[bool] = None
@@ -18,7 +24,56 @@ class TokenData(BaseModel):
     can_manage_points: Optional[bool] = None
     can_view_analytics: Optional[bool] = None
 
-def get_current_user(token: str = Depends(reusable_oauth2)):
+    class Config:
+        frozen = True
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified tokens, keyed by the token's SHA-256 digest.
+
+    Lets repeated requests with the same token skip signature verification
+    and claims validation. Entries are dropped once the token's `exp` passes.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[TokenData, Optional[float]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            claims, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                TOKEN_CACHE_LOOKUPS.labels("hit").inc()
+                return claims
+            del self._entries[key]
+        TOKEN_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def set(self, token: str, claims: TokenData, expires_at: Optional[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (claims, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE)
+
+async def get_current_user(token: str = Depends(reusable_oauth2)):
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -29,9 +84,10 @@ def get_current_user(token: str = Depends(reusable_oauth2)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    token_cache.set(token, token_data, payload.get("exp"))
     return token_data
 
-def get_current_admin_user(current_user: TokenData = Depends(get_current_user)):
+async def get_current_admin_user(current_user: TokenData = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return current_user
@@ -40,7 +96,7 @@ class PermissionChecker:
     def __init__(self, required_permissions: List[str]):
         self.required_permissions = required_permissions
 
-    def __call__(self, current_user: TokenData = Depends(get_current_admin_user)):
+    async def __call__(self, current_user: TokenData = Depends(get_current_admin_user)):
         for permission in self.required_permissions:
             if not getattr(current_user, permission, False):
                 raise HTTPException(
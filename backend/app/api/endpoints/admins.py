@@ -1,28 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Any
-from supabase import Client
+from supabase import AsyncClient
 
 from app.schemas.user import AdminCreate, AdminInDB, AdminUpdate
 from app.services.admin_service import AdminService, get_admin_service
 from app.api import deps
 from app.db.supabase import get_supabase_client
+from app.core.query_budget import query_budget
 
 router = APIRouter()
 
 @router.get("", response_model=List[AdminInDB], dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_admins"]))])
-def read_admins(
+async def read_admins(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
     """
     Retrieve all admin users.
     """
     admin_service = AdminService(db)
-    return admin_service.get_all_admins()
+    return await admin_service.get_all_admins()
 
 @router.get("/{admin_id}", response_model=AdminInDB, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_admins"]))])
-def read_admin_by_id(
+async def read_admin_by_id(
     *,
     admin_service: AdminService = Depends(get_admin_service),
     admin_id: int,
@@ -31,7 +32,7 @@ def read_admin_by_id(
     """
     Retrieve a specific admin user by ID.
     """
-    admin = admin_service.get_admin_by_id(admin_id=admin_id)
+    admin = await admin_service.get_admin_by_id(admin_id=admin_id)
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,9 +41,10 @@ def read_admin_by_id(
     return admin
 
 @router.post("", response_model=AdminInDB, status_code=status.HTTP_201_CREATED, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_admins"]))])
-def create_admin(
+@query_budget(1)
+async def create_admin(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     admin_in: AdminCreate,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -50,7 +52,7 @@ def create_admin(
     Create a new admin user.
     """
     admin_service = AdminService(db)
-    admin = admin_service.create_admin(admin_in=admin_in)
+    admin = await admin_service.create_admin(admin_in=admin_in)
     if not admin:
         raise HTTPException(
             status_code=400,
@@ -59,9 +61,10 @@ def create_admin(
     return admin
 
 @router.put("/{admin_id}", response_model=AdminInDB, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_admins"]))])
-def update_admin(
+@query_budget(1)
+async def update_admin(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     admin_id: int,
     admin_in: AdminUpdate,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -70,36 +73,35 @@ def update_admin(
     Update an admin user's details.
     """
     admin_service = AdminService(db)
-    admin = admin_service.get_admin_by_id(admin_id=admin_id)
-    if not admin:
+    updated_admin = await admin_service.update_admin(admin_id=admin_id, admin_in=admin_in)
+    if not updated_admin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Admin not found",
         )
-    updated_admin = admin_service.update_admin(admin_id=admin_id, admin_in=admin_in)
     return updated_admin
 
 @router.delete("/{admin_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_admins"]))])
-def delete_admin(
+@query_budget(1)
+async def delete_admin(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     admin_id: int,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> None:
     """
     Delete an admin user.
     """
+    # Token claims carry the id as a string.
+    if str(admin_id) == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admins cannot delete themselves.",
+        )
     admin_service = AdminService(db)
-    admin = admin_service.get_admin_by_id(admin_id=admin_id)
-    if not admin:
+    if not await admin_service.delete_admin(admin_id=admin_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Admin not found",
         )
-    if admin['id'] == current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admins cannot delete themselves.",
-        )
-    admin_service.delete_admin(admin_id=admin_id)
     return None
\ No newline at end of file
@@ -1,19 +1,40 @@
-from fastapi import APIRouter, Depends
-from typing import Any
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, List, Optional
 
 from app.api import deps
-from app.services.analytics import get_analytics_report
+from app.services.analytics import get_analytics_report, REPORT_NAMES
+
+# GA date formats: YYYY-MM-DD, today, yesterday or NdaysAgo
+GA_DATE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}|today|yesterday|\d+daysAgo)$")
 
 router = APIRouter()
 
 @router.get("", response_model=Any, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_view_analytics"]))])
-def get_analytics_data(
+async def get_analytics_data(
     *,
+    start_date: str = "28daysAgo",
+    end_date: str = "today",
+    reports: Optional[List[str]] = Query(None),
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
     """
     Retrieve Google Analytics data.
     Accessible only to admins with 'can_view_analytics' permission.
+    `reports` limits the response to the named reports; all are returned by default.
     """
-    report = get_analytics_report()
+    for date in (start_date, end_date):
+        if not GA_DATE_PATTERN.fullmatch(date):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid date '{date}'. Use YYYY-MM-DD, today, yesterday or NdaysAgo.",
+            )
+    unknown_reports = set(reports or []) - set(REPORT_NAMES)
+    if unknown_reports:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown reports: {', '.join(sorted(unknown_reports))}. Available: {', '.join(REPORT_NAMES)}",
+        )
+    report = await get_analytics_report(start_date=start_date, end_date=end_date, report_names=reports)
     return report
\ No newline at end of file
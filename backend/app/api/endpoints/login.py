@@ -8,18 +8,20 @@ from app.schemas.user import User, AdminInDB
 from app.core.security import create_access_token
 from app.api.deps import get_current_user
 from app.db.supabase import get_supabase_client
+from app.core.query_budget import query_budget
 
 router = APIRouter()
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+@query_budget(1)
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Any = Depends(get_supabase_client)
 ) -> Any:
     """
     OAuth2 compatible token login, gets an access token for future requests
     """
-    user = UserService(db).authenticate_user(password=form_data.password)
+    user = await UserService(db).authenticate_user(password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,22 +53,25 @@ def login_for_access_token(
 
 
 @router.get("/me", response_model=Union[User, AdminInDB])
-def read_users_me(
+@query_budget(1)
+async def read_users_me(
     current_user: dict = Depends(get_current_user),
-    db: Any = Depends(get_supabase_client)
+    db: Any = Depends(get_supabase_client),
+    fresh: bool = False,
 ):
     """
     Get current user.
+    Answered from the token claims and in-process caches; pass `fresh=true` to read from the database.
     """
     user_service = UserService(db)
     if current_user.role == 'admin':
-        user = user_service.get_admin(current_user.id)
+        user = await user_service.get_admin_profile(current_user, fresh=fresh)
     else:
-        user = user_service.get_student(current_user.id)
+        user = await user_service.get_student_profile(int(current_user.id), fresh=fresh)
 
     if user is None:
         raise HTTPException(
             status_code=404,
             detail="User not found",
         )
-    return user
\ No newline at end of file
+    return user
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Any
-from supabase import Client
+import asyncio
+import codecs
+import csv
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import List, Any, Dict, Optional
+from supabase import AsyncClient
 
-from app.schemas.user import User, UserCreate, UserUpdate
-from app.schemas.points import PointsAdd
-from app.services.student_service import StudentService
+from app.schemas.user import User, UserCreate, UserUpdate, UserPartial, LeaderboardEntryPartial, StudentImportReport
+from app.schemas.points import PointsAdd, PointsBulkAdd
+from app.services.student_service import StudentService, STUDENT_FIELDS, decode_cursor
+from app.services.user_service import UserService
+from app.services.content_versions import LEADERBOARD
+from app.services.leaderboard_stream import leaderboard_broadcaster, RESYNC
+from app.api.http_cache import conditional_response
 from app.api import deps
+from app.core.config import settings
 from app.db.supabase import get_supabase_client
+from app.core.query_budget import query_budget
 
 # Router for admin-only student operations
 admin_router = APIRouter()
@@ -17,9 +28,10 @@ student_router = APIRouter()
 
 
 @admin_router.post("", response_model=User, status_code=status.HTTP_201_CREATED, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
-def create_student(
+@query_budget(1)
+async def create_student(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     student_in: UserCreate,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -27,7 +39,7 @@ def create_student(
     Create new student (Admin only).
     """
     student_service = StudentService(db)
-    student = student_service.create_student(student_in=student_in)
+    student = await student_service.create_student(student_in=student_in)
     if not student:
         raise HTTPException(
             status_code=400,
@@ -35,34 +47,115 @@ def create_student(
         )
     return student
 
+@admin_router.post("/import", response_model=StudentImportReport, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
+async def import_students(
+    *,
+    db: AsyncClient = Depends(get_supabase_client),
+    file: UploadFile = File(...),
+    batch_size: int = Query(settings.STUDENT_IMPORT_BATCH_SIZE, ge=1, le=1000),
+    current_user: Any = Depends(deps.get_current_admin_user)
+) -> Any:
+    """
+    Bulk-create students from a CSV file (Admin only).
+    The file needs a header row with `name`, `password` and either `class` or `class_id`.
+    """
+    # Decode and parse the upload lazily, row by row, instead of reading it into memory.
+    # File reads happen in the thread pool so the event loop is never blocked on disk.
+    reader = csv.DictReader(codecs.iterdecode(file.file, "utf-8-sig"))
+    try:
+        fieldnames = await run_in_threadpool(lambda: reader.fieldnames)
+        if not fieldnames or not {"name", "password"} <= set(fieldnames):
+            raise HTTPException(status_code=400, detail="CSV must have 'name' and 'password' columns.")
+
+        student_service = StudentService(db)
+        return await student_service.import_students(rows=iterate_in_threadpool(reader), batch_size=batch_size)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV file: {e}")
+
 @student_router.get("/me", response_model=User)
-def read_student_me(
-    db: Client = Depends(get_supabase_client),
-    current_user: User = Depends(deps.get_current_user)
+@query_budget(1)
+async def read_student_me(
+    db: AsyncClient = Depends(get_supabase_client),
+    current_user: User = Depends(deps.get_current_user),
+    fresh: bool = False,
 ) -> Any:
     """
     Get current logged-in student's data.
+    Served from in-process caches; pass `fresh=true` to read from the database.
     """
-    student_service = StudentService(db)
-    student = student_service.get_student_by_id(student_id=current_user.id)
+    user_service = UserService(db)
+    student = await user_service.get_student_profile(int(current_user.id), fresh=fresh)
     return student
 
-@admin_router.get("", response_model=List[User], dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
-def read_students(
-    db: Client = Depends(get_supabase_client),
+def parse_fields(fields: Optional[str], allowed: List[str]) -> Optional[List[str]]:
+    """Parses a comma-separated `fields` parameter (None means all fields)."""
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail=f"No fields selected. Allowed: {', '.join(allowed)}")
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return requested
+
+
+def page_headers(page: Dict[str, Any]) -> Dict[str, str]:
+    headers = {}
+    if page["total"] is not None:
+        headers["X-Total-Count"] = str(page["total"])
+    if page["next_cursor"] is not None:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return headers
+
+
+@admin_router.get("", response_model=List[UserPartial], response_model_exclude_unset=True, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
+@query_budget(1)
+async def read_students(
+    response: Response,
+    db: AsyncClient = Depends(get_supabase_client),
+    current_user: Any = Depends(deps.get_current_admin_user),
+    limit: Optional[int] = Query(None, ge=1, le=settings.STUDENT_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    class_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. `id,name,points`"),
+) -> Any:
+    """
+    Retrieve students ordered by points (Admin only).
+    Pass `limit` to page through them: the X-Next-Cursor header is the `cursor`
+    for the next page, and the first page carries X-Total-Count.
+    """
+    student_service = StudentService(db)
+    try:
+        page = await student_service.list_students(
+            limit=limit, cursor=cursor, class_id=class_id, fields=parse_fields(fields, list(STUDENT_FIELDS))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page_headers(page))
+    return page["students"]
+
+
+@admin_router.post("/add-points", response_model=List[User], dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_points"]))])
+@query_budget(1)
+async def add_points_bulk(
+    *,
+    db: AsyncClient = Depends(get_supabase_client),
+    points_in: PointsBulkAdd,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
     """
-    Retrieve all students (Admin only).
+    Add points to a whole class or to a list of students in one operation (Admin only).
     """
     student_service = StudentService(db)
-    return student_service.get_all_students()
+    return await student_service.add_points_bulk(points_in=points_in)
 
 
 @admin_router.get("/{student_id}", response_model=User, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
-def read_student_by_id(
+@query_budget(1)
+async def read_student_by_id(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     student_id: int,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -70,16 +163,17 @@ def read_student_by_id(
     Retrieve a specific student by ID (Admin only).
     """
     student_service = StudentService(db)
-    student = student_service.get_student_by_id(student_id=student_id)
+    student = await student_service.get_student_by_id(student_id=student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
 
 
 @admin_router.put("/{student_id}", response_model=User, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
-def update_student(
+@query_budget(1)
+async def update_student(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     student_id: int,
     student_in: UserUpdate,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -88,16 +182,16 @@ def update_student(
     Update a student's info (Admin only).
     """
     student_service = StudentService(db)
-    student = student_service.get_student_by_id(student_id=student_id)
-    if not student:
+    updated_student = await student_service.update_student(student_id=student_id, student_update=student_in)
+    if not updated_student:
         raise HTTPException(status_code=404, detail="Student not found")
-    updated_student = student_service.update_student(student_id=student_id, student_update=student_in)
     return updated_student
 
 @admin_router.post("/{student_id}/add-points", response_model=User, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_points"]))])
-def add_student_points(
+@query_budget(1)
+async def add_student_points(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     student_id: int,
     points_in: PointsAdd,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -106,19 +200,16 @@ def add_student_points(
     Add points to a student's score (Admin only).
     """
     student_service = StudentService(db)
-    student = student_service.get_student_by_id(student_id=student_id)
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-
-    updated_student = student_service.add_points(student_id=student_id, points_to_add=points_in.points)
+    updated_student = await student_service.add_points(student_id=student_id, points_to_add=points_in.points)
     if not updated_student:
-        raise HTTPException(status_code=400, detail="Could not add points to student.")
+        raise HTTPException(status_code=404, detail="Student not found")
     return updated_student
 
 @admin_router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_students"]))])
-def delete_student(
+@query_budget(1)
+async def delete_student(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     student_id: int,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> None:
@@ -126,21 +217,106 @@ def delete_student(
     Delete a student (Admin only).
     """
     student_service = StudentService(db)
-    student_to_delete = student_service.get_student_by_id(student_id=student_id)
-    if not student_to_delete:
+    if not await student_service.delete_student(student_id=student_id):
         raise HTTPException(status_code=404, detail="Student not found")
 
-    student_service.delete_student(student_id=student_id)
-
 
 # --- Public Endpoint ---
 
-@public_router.get("/", response_model=List[User])
-def read_leaderboard(
-    db: Client = Depends(get_supabase_client),
+@public_router.get("/", response_model=List[LeaderboardEntryPartial], response_model_exclude_unset=True)
+@query_budget(1)
+async def read_leaderboard(
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client),
+    limit: Optional[int] = Query(None, ge=1, le=settings.STUDENT_PAGE_MAX_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    class_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. `id,name,points,rank`"),
 ) -> Any:
     """
-    Retrieve the top students for the public leaderboard.
+    Retrieve the ranked students for the public leaderboard.
+    Served from the in-process leaderboard cache. Pages are selected with
+    `limit` and either `cursor` (from the X-Next-Cursor header) or `offset`.
+    Supports conditional requests: a matching If-None-Match returns 304.
     """
     student_service = StudentService(db)
-    return student_service.get_all_students()
\ No newline at end of file
+    selected_fields = parse_fields(fields, [*STUDENT_FIELDS, "rank"])
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers: Dict[str, str] = {}
+
+    async def load_page():
+        try:
+            page = await student_service.get_leaderboard(
+                limit=limit, offset=offset, cursor=cursor, class_id=class_id, fields=selected_fields
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers.update(page_headers(page))
+        return page["students"]
+
+    return await conditional_response(
+        request,
+        LEADERBOARD,
+        # Built from the parsed parameters, so spellings of the same page share one ETag.
+        (limit, offset, after, class_id, None if selected_fields is None else frozenset(selected_fields)),
+        List[LeaderboardEntryPartial],
+        load_page,
+        settings.LEADERBOARD_CACHE_CONTROL,
+        exclude_unset=True,
+        headers=headers,
+    )
+
+
+@public_router.get("/stream")
+# One connection can outlive many resyncs, each of which may reload the leaderboard.
+@query_budget(None)
+async def stream_leaderboard(
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client),
+) -> Any:
+    """
+    Live leaderboard as Server-Sent Events.
+    Sends a `snapshot` event with the ranked students, then `delta` events
+    with only the students whose points or rank changed (and `removed` ids).
+    A new snapshot is sent whenever the client falls behind.
+    """
+    if leaderboard_broadcaster.subscriber_count >= settings.LEADERBOARD_STREAM_MAX_CLIENTS:
+        raise HTTPException(status_code=503, detail="Too many open leaderboard streams")
+    student_service = StudentService(db)
+
+    async def load_students():
+        page = await student_service.get_leaderboard()
+        return page["students"]
+
+    async def events():
+        subscription = leaderboard_broadcaster.subscribe()
+        try:
+            needs_snapshot = True
+            while True:
+                if needs_snapshot:
+                    # Shared by every stream that needs a snapshot of the same leaderboard.
+                    yield await leaderboard_broadcaster.snapshot_event(load_students)
+                    needs_snapshot = False
+                try:
+                    message = await subscription.next(timeout=settings.LEADERBOARD_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": heartbeat\n\n"
+                    continue
+                if message is RESYNC:
+                    needs_snapshot = True
+                else:
+                    yield message
+        finally:
+            leaderboard_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
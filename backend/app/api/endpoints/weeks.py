@@ -1,22 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Request
 from typing import List, Any
-from supabase import Client
+from supabase import AsyncClient
 
-from app.schemas.week import Week, WeekCreate, WeekUpdate, ContentCard, ContentCardCreate, ContentCardUpdate
+from app.schemas.week import Week, WeekCreate, WeekUpdate, ContentCard, ContentCardCreate, ContentCardUpdate, VideoUploadCreate, VideoUploadStatus
 from app.services.week_service import WeekService
+from app.services.video_upload_service import VideoUploadService
+from app.services.content_versions import WEEKS
+from app.services.weeks_snapshot import weeks_snapshot
+from app.api.http_cache import conditional_response, encoded_response
 from app.api import deps
 from app.core.config import settings
 from app.db.supabase import get_supabase_client
+from app.core.query_budget import query_budget
 
 admin_router = APIRouter()
 public_router = APIRouter()
 
+
+def storage_error(error: httpx.HTTPStatusError) -> HTTPException:
+    """Maps a failed Supabase Storage call to an API error."""
+    upstream_status = error.response.status_code
+    if upstream_status == 409:
+        return HTTPException(status_code=409, detail="Upload offset mismatch. Read the upload status and resume from its offset.")
+    if upstream_status in (404, 410):
+        return HTTPException(status_code=404, detail="Upload not found or expired")
+    return HTTPException(status_code=502, detail="Video storage request failed")
+
 # --- Admin Week Endpoints ---
 
 @admin_router.post("", response_model=Week, status_code=status.HTTP_201_CREATED, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def create_week(
+@query_budget(1)
+async def create_week(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     week_in: WeekCreate,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -24,13 +41,13 @@ def create_week(
     Create a new week.
     """
     week_service = WeekService(db)
-    week = week_service.create_week(week_in=week_in)
-    return week_service.get_week_by_id(week["id"])
+    return await week_service.create_week(week_in=week_in)
 
 @admin_router.put("/{week_id}", response_model=Week, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def update_week(
+@query_budget(1)
+async def update_week(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     week_id: int,
     week_in: WeekUpdate,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -39,15 +56,16 @@ def update_week(
     Update a week's details (title, lock status).
     """
     week_service = WeekService(db)
-    updated_week = week_service.update_week(week_id=week_id, week_in=week_in)
+    updated_week = await week_service.update_week(week_id=week_id, week_in=week_in)
     if not updated_week:
         raise HTTPException(status_code=404, detail="Week not found")
-    return week_service.get_week_by_id(updated_week["id"])
+    return updated_week
 
 @admin_router.post("/{week_id}/video", response_model=Week, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def upload_week_video(
+@query_budget(None)
+async def upload_week_video(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     week_id: int,
     file: UploadFile = File(...),
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -56,16 +74,121 @@ def upload_week_video(
     Upload a video for a week.
     """
     week_service = WeekService(db)
-    if not week_service.get_week_by_id(week_id):
+    # Checked first so a video is never uploaded for a missing week.
+    if not await week_service.get_week_by_id(week_id):
+        raise HTTPException(status_code=404, detail="Week not found")
+
+    try:
+        updated_week = await week_service.upload_video(week_id, file, settings.SUPABASE_BUCKET)
+    except httpx.HTTPStatusError as e:
+        raise storage_error(e)
+    if not updated_week:
+        raise HTTPException(status_code=404, detail="Week not found")
+    return updated_week
+
+@admin_router.post("/{week_id}/video/uploads", response_model=VideoUploadStatus, status_code=status.HTTP_201_CREATED, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
+async def create_video_upload(
+    *,
+    db: AsyncClient = Depends(get_supabase_client),
+    week_id: int,
+    upload_in: VideoUploadCreate,
+    current_user: Any = Depends(deps.get_current_admin_user)
+) -> Any:
+    """
+    Start a resumable video upload for a week.
+    Send the file with PATCH requests of `chunk_size` bytes to the returned upload.
+    """
+    week_service = WeekService(db)
+    if not await week_service.get_week_by_id(week_id):
         raise HTTPException(status_code=404, detail="Week not found")
 
-    updated_week = week_service.upload_video(week_id, file, settings.SUPABASE_BUCKET)
-    return week_service.get_week_by_id(updated_week["id"])
+    uploader = VideoUploadService(db, settings.SUPABASE_BUCKET)
+    try:
+        return await uploader.create_upload(week_id, upload_in.filename, upload_in.content_type, upload_in.size)
+    except httpx.HTTPStatusError as e:
+        raise storage_error(e)
+
+@admin_router.get("/{week_id}/video/uploads/{upload_id}", response_model=VideoUploadStatus, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
+async def read_video_upload(
+    *,
+    db: AsyncClient = Depends(get_supabase_client),
+    week_id: int,
+    upload_id: str,
+    current_user: Any = Depends(deps.get_current_admin_user)
+) -> Any:
+    """
+    Get the progress of a resumable upload. Resume an interrupted upload from `offset`.
+    """
+    upload = VideoUploadService.decode_upload_id(upload_id, week_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+
+    uploader = VideoUploadService(db, settings.SUPABASE_BUCKET)
+    try:
+        offset = await uploader.get_offset(upload)
+    except httpx.HTTPStatusError as e:
+        raise storage_error(e)
+    return {
+        "upload_id": upload_id,
+        "offset": offset,
+        "size": upload["size"],
+        "chunk_size": uploader.chunk_size,
+        "complete": offset >= upload["size"],
+    }
+
+@admin_router.patch("/{week_id}/video/uploads/{upload_id}", response_model=VideoUploadStatus, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
+async def upload_video_chunk(
+    *,
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client),
+    week_id: int,
+    upload_id: str,
+    upload_offset: int = Header(...),
+    current_user: Any = Depends(deps.get_current_admin_user)
+) -> Any:
+    """
+    Upload the next chunk of a resumable upload, starting at the `Upload-Offset` header.
+    When the last chunk is received the week's video is replaced and the week is returned.
+    """
+    upload = VideoUploadService.decode_upload_id(upload_id, week_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+
+    uploader = VideoUploadService(db, settings.SUPABASE_BUCKET)
+    too_large = HTTPException(status_code=413, detail=f"Chunks must be at most {uploader.chunk_size} bytes")
+    if int(request.headers.get("content-length") or 0) > uploader.chunk_size:
+        raise too_large
+    # Read the body incrementally: a chunked request has no Content-Length, so the
+    # limit is enforced on the bytes received and never more than one chunk is buffered.
+    received = bytearray()
+    async for data in request.stream():
+        received += data
+        if len(received) > uploader.chunk_size:
+            raise too_large
+    chunk = bytes(received)
+
+    try:
+        offset = await uploader.write_chunk(upload, upload_offset, chunk)
+    except httpx.HTTPStatusError as e:
+        raise storage_error(e)
+
+    result = {
+        "upload_id": upload_id,
+        "offset": offset,
+        "size": upload["size"],
+        "chunk_size": uploader.chunk_size,
+        "complete": offset >= upload["size"],
+    }
+    if result["complete"]:
+        week_service = WeekService(db)
+        result["week"] = await week_service.set_video(week_id, await uploader.get_public_url(upload["path"]))
+    return result
 
 @admin_router.delete("/{week_id}", response_model=Week, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def delete_week(
+@query_budget(1)
+async def delete_week(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     week_id: int,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -73,19 +196,18 @@ def delete_week(
     Delete a week.
     """
     week_service = WeekService(db)
-    week = week_service.get_week_by_id(week_id=week_id)
+    week = await week_service.delete_week(week_id=week_id)
     if not week:
         raise HTTPException(status_code=404, detail="Week not found")
-
-    week_service.delete_week(week_id=week_id)
     return week
 
 # --- Admin Content Card Endpoints ---
 
 @admin_router.post("/{week_id}/cards", response_model=ContentCard, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def create_content_card(
+@query_budget(1)
+async def create_content_card(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     week_id: int,
     card_in: ContentCardCreate,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -94,16 +216,16 @@ def create_content_card(
     Add a new content card to a week.
     """
     week_service = WeekService(db)
-    if not week_service.get_week_by_id(week_id):
+    card = await week_service.add_card_to_week(week_id=week_id, card_in=card_in)
+    if not card:
         raise HTTPException(status_code=404, detail="Week not found")
-
-    card = week_service.add_card_to_week(week_id=week_id, card_in=card_in)
     return card
 
 @admin_router.put("/cards/{card_id}", response_model=ContentCard, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def update_content_card(
+@query_budget(1)
+async def update_content_card(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     card_id: int,
     card_in: ContentCardUpdate,
     current_user: Any = Depends(deps.get_current_admin_user)
@@ -112,15 +234,16 @@ def update_content_card(
     Update a content card.
     """
     week_service = WeekService(db)
-    card = week_service.update_card(card_id=card_id, card_in=card_in)
+    card = await week_service.update_card(card_id=card_id, card_in=card_in)
     if not card:
         raise HTTPException(status_code=404, detail="Content card not found")
     return card
 
 @admin_router.delete("/cards/{card_id}", response_model=ContentCard, dependencies=[Depends(deps.PermissionChecker(required_permissions=["can_manage_weeks"]))])
-def delete_content_card(
+@query_budget(1)
+async def delete_content_card(
     *,
-    db: Client = Depends(get_supabase_client),
+    db: AsyncClient = Depends(get_supabase_client),
     card_id: int,
     current_user: Any = Depends(deps.get_current_admin_user)
 ) -> Any:
@@ -128,7 +251,7 @@ def delete_content_card(
     Delete a content card.
     """
     week_service = WeekService(db)
-    card = week_service.delete_card(card_id=card_id)
+    card = await week_service.delete_card(card_id=card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Content card not found")
     return card
@@ -136,36 +259,55 @@ def delete_content_card(
 # --- Public Week Endpoints ---
 
 @public_router.get("/", response_model=List[Week])
-def read_weeks(
-    db: Client = Depends(get_supabase_client)
+@query_budget(1)
+async def read_weeks(
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client)
 ) -> Any:
     """
     Retrieve all weeks with their content.
+    Served from the pre-encoded weeks snapshot, rebuilt only after a change.
+    Supports conditional requests: a matching If-None-Match returns 304.
     """
     week_service = WeekService(db)
-    return week_service.get_all_weeks_with_content()
+    snapshot = await weeks_snapshot.get(week_service.get_all_weeks_with_content)
+    return encoded_response(request, snapshot, settings.WEEKS_CACHE_CONTROL)
 
 @public_router.get("/all", response_model=List[Week])
-def read_all_weeks(
-    db: Client = Depends(get_supabase_client),
+@query_budget(1)
+async def read_all_weeks(
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client),
 ) -> Any:
     """
     Retrieve all weeks with their content.
+    Served from the pre-encoded weeks snapshot, rebuilt only after a change.
+    Supports conditional requests: a matching If-None-Match returns 304.
     """
     week_service = WeekService(db)
-    return week_service.get_all_weeks_with_content()
+    snapshot = await weeks_snapshot.get(week_service.get_all_weeks_with_content)
+    return encoded_response(request, snapshot, settings.WEEKS_CACHE_CONTROL)
 
 @public_router.get("/{week_id}", response_model=Week)
-def read_week(
+@query_budget(1)
+async def read_week(
     *,
-    db: Client = Depends(get_supabase_client),
+    request: Request,
+    db: AsyncClient = Depends(get_supabase_client),
     week_id: int
 ) -> Any:
     """
     Get a specific week by ID, if it's not locked.
+    Supports conditional requests: a matching If-None-Match returns 304.
     """
     week_service = WeekService(db)
-    week = week_service.get_week_by_id(week_id=week_id)
-    if not week:
-        raise HTTPException(status_code=404, detail="Week not found")
-    return week
\ No newline at end of file
+
+    async def load_week():
+        week = await week_service.get_week_by_id(week_id=week_id)
+        if not week:
+            raise HTTPException(status_code=404, detail="Week not found")
+        return week
+
+    return await conditional_response(
+        request, WEEKS, week_id, Week, load_week, settings.WEEKS_CACHE_CONTROL
+    )
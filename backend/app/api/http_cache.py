@@ -0,0 +1,126 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from app.services.content_versions import content_versions
+from app.services.weeks_snapshot import EncodedBody
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Returns the q-value of each content-coding in an Accept-Encoding header (RFC 9110)."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, parameters = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def accepted_encoding(accept_encoding: str, encodings: Dict[str, bytes]) -> Optional[str]:
+    """
+    Picks the precompressed variant with the highest q-value the client
+    accepts (never one with q=0); ties prefer Brotli, like the compression middleware.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in ("br", "gzip"):
+        if encoding not in encodings:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encoded_response(request: Request, encoded: EncodedBody, cache_control: str) -> Response:
+    """
+    Serves a pre-encoded JSON body as is, compressed if the client accepts one
+    of its variants; a matching If-None-Match returns 304.
+    """
+    encoding = accepted_encoding(request.headers.get("accept-encoding", ""), encoded.encodings)
+    etag = encoded.etag_for(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if encoded.encodings:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = encoded.body
+    if encoding is not None:
+        # The compression middleware leaves responses with a Content-Encoding alone.
+        headers["Content-Encoding"] = encoding
+        body = encoded.encodings[encoding]
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def conditional_response(
+    request: Request,
+    namespace: str,
+    key: Hashable,
+    response_type: Any,
+    load: Callable[[], Awaitable[Any]],
+    cache_control: str,
+    exclude_unset: bool = False,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serves `load()` as JSON with a weak ETag and the given Cache-Control.
+    The compression middleware may encode the body after the ETag is set,
+    so the ETag only promises an equivalent representation, not identical bytes.
+
+    If the client's If-None-Match matches the ETag remembered for
+    (namespace, key), a 304 is returned without calling `load`. `headers`
+    are added to full responses; `load` may fill them in.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    etag = content_versions.get_etag(namespace, key)
+    if etag is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
+    version = content_versions.version(namespace)
+    data = await load()
+    adapter = get_type_adapter(response_type)
+    body = adapter.dump_json(adapter.validate_python(data), by_alias=True, exclude_unset=exclude_unset)
+    # Extra headers (such as a total count) are part of the representation too.
+    etag = "W/" + content_versions.make_etag(body + "".join(f"\n{name}: {value}" for name, value in sorted((headers or {}).items())).encode())
+    content_versions.set_etag(namespace, key, version, etag)
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**(headers or {}), "ETag": etag, "Cache-Control": cache_control},
+    )
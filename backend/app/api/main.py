@@ -8,7 +8,7 @@ from .endpoints import login, students, weeks, classes, admins, analytics
 api_router = APIRouter()
 
 @api_router.get("/", status_code=200)
-def health_check():
+async def health_check():
     """
     Health check endpoint.
     """
@@ -16,17 +16,82 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_BUCKET: str = "videos"
+    # Resumable uploads to Supabase Storage must use 6 MB chunks
+    VIDEO_UPLOAD_CHUNK_SIZE: int = 6 * 1024 * 1024
+
+    # Supabase HTTP connection pool (shared by all requests)
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0 # seconds
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_TIMEOUT: float = 10.0 # seconds
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0 # seconds
+    SUPABASE_STORAGE_TIMEOUT: float = 120.0 # seconds
+
+    # Data access backend for the hot paths: "supabase" (PostgREST over HTTP) or
+    # "postgres" (direct asyncpg pool to DATABASE_URL). Set the statement cache
+    # size to 0 when DATABASE_URL points at a transaction-mode pooler.
+    DATABASE_BACKEND: str = "supabase"
+    DATABASE_URL: Optional[str] = None
+    POSTGRES_POOL_MIN_SIZE: int = 2
+    POSTGRES_POOL_MAX_SIZE: int = 20
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100
+
+    # Number of students inserted per request during a bulk import
+    STUDENT_IMPORT_BATCH_SIZE: int = 500
+    # Largest page size accepted by the admin student listing
+    STUDENT_PAGE_MAX_SIZE: int = 500
 
     # Security settings
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8 # 8 days
+    # Number of verified tokens kept in memory (0 disables the cache)
+    TOKEN_CACHE_SIZE: int = 10000
+    # Seconds a user profile read for /me endpoints is reused (0 disables the cache)
+    PROFILE_CACHE_TTL: int = 30
+
+    # Number of response ETags remembered for If-None-Match (0 disables them)
+    ETAG_CACHE_SIZE: int = 10000
+    # Cache-Control sent with public responses (clients revalidate with their ETag)
+    WEEKS_CACHE_CONTROL: str = "public, max-age=60, stale-while-revalidate=300"
+    LEADERBOARD_CACHE_CONTROL: str = "public, max-age=5, stale-while-revalidate=30"
+
+    # Live leaderboard stream (Server-Sent Events)
+    LEADERBOARD_STREAM_HEARTBEAT: float = 15.0 # seconds between keep-alive comments
+    LEADERBOARD_STREAM_QUEUE_SIZE: int = 100 # events buffered per client before it is resynced
+    LEADERBOARD_STREAM_MAX_CLIENTS: int = 5000 # open streams per worker
+
+    # Cross-worker cache invalidation. Leave INVALIDATION_TRANSPORT unset when
+    # running a single worker; use "unix" for several workers on one host and
+    # "postgres" (LISTEN/NOTIFY over a direct, non-pooled connection) across hosts.
+    INVALIDATION_TRANSPORT: Optional[str] = None
+    INVALIDATION_SOCKET_PATH: str = "/tmp/ghars-invalidation.sock"
+    INVALIDATION_DATABASE_URL: Optional[str] = None # defaults to DATABASE_URL
+    INVALIDATION_CHANNEL: str = "ghars_cache_invalidation"
+
+    # Responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESSION_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Prometheus metrics at /metrics (request, thread pool and upstream call timings)
+    METRICS_ENABLED: bool = True
+
+    # Upstream calls allowed per request for endpoints without their own
+    # @query_budget. QUERY_BUDGET_MODE: unset (off), "warn" (print the request
+    # and the stack of the call that went over) or "raise" (fail the request).
+    QUERY_BUDGET_DEFAULT: int = 5
+    QUERY_BUDGET_MODE: Optional[str] = None
 
     # Google Analytics Configuration
     GA_PROPERTY_ID: str = "508192372"
     GA4_PROJECT_ID: Optional[str] = None
     GA4_CLIENT_EMAIL: Optional[str] = None
     GA4_PRIVATE_KEY: Optional[str] = None
+    # Seconds before cached reports are refreshed in the background
+    ANALYTICS_CACHE_TTL: int = 600
+    ANALYTICS_REALTIME_CACHE_TTL: int = 60
 
     class Config:
         case_sensitive = True
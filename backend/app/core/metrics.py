@@ -0,0 +1,255 @@
+"""
+Prometheus metrics, served at /metrics.
+
+- Requests: latency histogram and in-flight gauge per route template
+  (e.g. /api/v1/weeks/{week_id}), so path parameters do not multiply series.
+- Thread pool: threads in use and tasks waiting for one, sampled on scrape.
+- Upstream calls: a counter and latency histogram for every Supabase
+  (PostgREST, Storage, direct Postgres) and Google Analytics call, labelled
+  by service, target (table, RPC, bucket or report) and operation.
+- Token cache: lookups of verified tokens, labelled hit or miss.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so every worker's samples are aggregated on scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+import httpx
+from anyio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.query_budget import record_query
+
+# Label used for requests that match no route, so unknown paths cannot create new series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UPSTREAM_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, until the response body was sent.",
+    ["method", "route", "status"],
+    buckets=REQUEST_LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+THREAD_POOL_IN_USE = Gauge(
+    "threadpool_threads_in_use",
+    "Worker threads currently running blocking code (sync endpoints, run_in_threadpool).",
+    multiprocess_mode="livesum",
+)
+THREAD_POOL_SIZE = Gauge(
+    "threadpool_size",
+    "Maximum number of worker threads.",
+    multiprocess_mode="livesum",
+)
+THREAD_POOL_WAITING = Gauge(
+    "threadpool_tasks_waiting",
+    "Tasks waiting for a free worker thread.",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_CALLS = Counter(
+    "upstream_calls_total",
+    "Calls made to upstream services.",
+    ["service", "target", "operation", "outcome"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_call_duration_seconds",
+    "Time spent in calls to upstream services, including reading the response.",
+    ["service", "target", "operation"],
+    buckets=UPSTREAM_LATENCY_BUCKETS,
+)
+TOKEN_CACHE_LOOKUPS = Counter(
+    "token_cache_lookups_total",
+    "Bearer token lookups in the verified-token cache.",
+    ["result"],
+)
+
+
+def observe_upstream(service: str, target: str, operation: str, outcome: str, duration: float) -> None:
+    UPSTREAM_CALLS.labels(service, target, operation, outcome).inc()
+    UPSTREAM_LATENCY.labels(service, target, operation).observe(duration)
+
+
+@contextmanager
+def track_upstream(service: str, target: str, operation: str) -> Iterator[None]:
+    """Times the enclosed upstream call; exceptions count as errors."""
+    record_query(service, target, operation)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe_upstream(service, target, operation, outcome, time.perf_counter() - started)
+
+
+# --- Requests ---
+
+def route_template(scope: Scope) -> str:
+    """Returns the path template of the route that will handle the request."""
+    partial = None
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and in-flight count of every HTTP request, by route
+    template. Latency runs until the last body chunk is sent, so it covers
+    streamed and compressed responses too.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            REQUEST_LATENCY.labels(method, route, status).observe(time.perf_counter() - started)
+
+
+# --- Upstream HTTP calls ---
+
+def describe_supabase_request(request: httpx.Request) -> Tuple[str, str, str]:
+    """
+    Returns the (service, target, operation) labels of a request made by the
+    Supabase client: the table or RPC for PostgREST, the bucket for Storage.
+    """
+    parts = request.url.path.strip("/").split("/")
+    method = request.method
+    if parts[:2] == ["rest", "v1"] and len(parts) > 2:
+        if parts[2] == "rpc" and len(parts) > 3:
+            return "postgrest", parts[3], "rpc"
+        if method == "POST":
+            prefer = request.headers.get("prefer", "")
+            operation = "upsert" if "resolution=" in prefer else "insert"
+        else:
+            operation = {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}.get(method, method.lower())
+        return "postgrest", parts[2], operation
+    if parts[:2] == ["storage", "v1"] and len(parts) > 2:
+        if parts[2] == "upload" and parts[3:4] == ["resumable"]:
+            # TUS requests carry the bucket in their metadata; label them all as one target.
+            return "storage", "resumable", {"POST": "create_upload", "PATCH": "upload_chunk", "HEAD": "upload_offset"}.get(method, method.lower())
+        if parts[2] == "object" and len(parts) > 3:
+            bucket = parts[4] if parts[3] in ("public", "sign", "authenticated") and len(parts) > 4 else parts[3]
+            return "storage", bucket, method.lower()
+        return "storage", parts[2], method.lower()
+    return "supabase", parts[0] if parts else "", method.lower()
+
+
+class _TimedStream(httpx.AsyncByteStream):
+    """Response body that records the call once it has been read and closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, labels: Tuple[str, str, str], outcome: str, started: float):
+        self._stream = stream
+        self._labels = labels
+        self._outcome = outcome
+        self._started = started
+        self._recorded = False
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._outcome = "error"
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._recorded:
+                self._recorded = True
+                observe_upstream(*self._labels, self._outcome, time.perf_counter() - self._started)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport to record every Supabase call, so no service
+    needs timing code around its `.execute()` calls.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        labels = describe_supabase_request(request)
+        record_query(*labels)
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            observe_upstream(*labels, "error", time.perf_counter() - started)
+            raise
+        outcome = "ok" if response.status_code < 400 else "error"
+        response.stream = _TimedStream(response.stream, labels, outcome, started)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# --- Exposition ---
+
+def sample_thread_pool() -> None:
+    limiter = to_thread.current_default_thread_limiter()
+    THREAD_POOL_IN_USE.set(limiter.borrowed_tokens)
+    THREAD_POOL_SIZE.set(limiter.total_tokens)
+    THREAD_POOL_WAITING.set(limiter.statistics().tasks_waiting)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    sample_thread_pool()
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,173 @@
+"""
+Per-request budgets for upstream calls (Supabase, Postgres, Google Analytics).
+
+Every upstream call timed by app/core/metrics.py is also counted here, as
+it starts, both against the request it was made for and by any open
+`count_queries()` blocks. This makes extra round trips (N+1 loops,
+re-reading a row that was just written) visible:
+
+- In tests, wrap a request in `assert_max_queries(n)` (or decorate the test
+  with `max_queries(n)`) to fail when an endpoint makes more than n calls.
+- In staging, set QUERY_BUDGET_MODE=warn to log a warning (logger
+  "app.core.query_budget"), with the stack of the call that went over,
+  whenever a request exceeds its budget. Use "raise" to fail such requests
+  outright.
+
+Endpoints declare their budget with the `@query_budget(n)` decorator; all
+others get QUERY_BUDGET_DEFAULT.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+Call = Tuple[str, str, str]
+
+logger = logging.getLogger(__name__)
+
+# Only frames from the application's own code are shown in warnings.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_calls: Optional[int]) -> Callable:
+    """
+    Sets the number of upstream calls an endpoint may make per request
+    (None for endpoints whose calls scale with the input, like chunked uploads).
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.query_budget = max_calls
+        return endpoint
+    return decorator
+
+
+class RequestQueries:
+    """The upstream calls made while handling one request."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.calls: List[Call] = []
+        self.over_budget_stack: Optional[str] = None
+
+    @property
+    def budget(self) -> Optional[int]:
+        # The route is only known once the router has matched the request.
+        route = self.scope.get("route")
+        return getattr(getattr(route, "endpoint", None), "query_budget", settings.QUERY_BUDGET_DEFAULT)
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", self.scope["path"])
+
+    def record(self, call: Call) -> None:
+        self.calls.append(call)
+        budget = self.budget
+        if budget is not None and len(self.calls) == budget + 1:
+            if settings.QUERY_BUDGET_MODE == "raise":
+                raise QueryBudgetExceeded(self.describe())
+            frames = [frame for frame in traceback.extract_stack()[:-2] if frame.filename.startswith(APP_DIR)]
+            self.over_budget_stack = "".join(traceback.format_list(frames))
+
+    def describe(self) -> str:
+        calls = ", ".join("/".join(call) for call in self.calls)
+        return (
+            f"{self.scope['method']} {self.route} made {len(self.calls)} upstream calls "
+            f"(budget {self.budget}): {calls}"
+        )
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("query_budget_request", default=None)
+
+# Calls seen by the open count_queries() blocks. Shared across threads, since
+# the test client runs the app on its own event loop thread.
+_watchers: List[List[Call]] = []
+_watchers_lock = threading.Lock()
+
+
+def record_query(service: str, target: str, operation: str) -> None:
+    call = (service, target, operation)
+    if _watchers:
+        with _watchers_lock:
+            for calls in _watchers:
+                calls.append(call)
+    request = _current_request.get()
+    if request is not None:
+        request.record(call)
+
+
+class QueryBudgetMiddleware:
+    """Counts the upstream calls of each HTTP request and reports requests over budget."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestQueries(scope)
+        token = _current_request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            if request.over_budget_stack is not None:
+                logger.warning(
+                    "Query budget exceeded: %s\nCall that went over budget:\n%s",
+                    request.describe(), request.over_budget_stack,
+                )
+
+
+@contextmanager
+def count_queries() -> Iterator[List[Call]]:
+    """Collects the (service, target, operation) of every upstream call made inside the block."""
+    calls: List[Call] = []
+    with _watchers_lock:
+        _watchers.append(calls)
+    try:
+        yield calls
+    finally:
+        with _watchers_lock:
+            _watchers.remove(calls)
+
+
+@contextmanager
+def assert_max_queries(max_calls: int) -> Iterator[List[Call]]:
+    """Fails with AssertionError if the block makes more than `max_calls` upstream calls."""
+    with count_queries() as calls:
+        yield calls
+    if len(calls) > max_calls:
+        listing = "\n".join(f"  {'/'.join(call)}" for call in calls)
+        raise AssertionError(f"Expected at most {max_calls} upstream calls, got {len(calls)}:\n{listing}")
+
+
+def max_queries(max_calls: int) -> Callable:
+    """Test decorator: fails the (sync or async) test if it makes more than `max_calls` upstream calls."""
+    def decorator(test: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(test):
+            @functools.wraps(test)
+            async def async_wrapper(*args, **kwargs):
+                with assert_max_queries(max_calls):
+                    return await test(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(test)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(max_calls):
+                return test(*args, **kwargs)
+        return wrapper
+    return decorator
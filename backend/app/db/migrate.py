@@ -0,0 +1,87 @@
+"""
+Applies the SQL migrations in migrations/ (at the repository root).
+
+Migrations are files named NNNN_description.sql, applied in order, each in
+its own transaction, and recorded in the `schema_migrations` table so they
+run once per database. An advisory lock keeps concurrent runs (e.g. several
+containers starting together) from applying the same migration twice.
+
+Run from the backend directory with a direct (session-mode) connection:
+
+    DATABASE_URL=postgresql://... python -m app.db.migrate
+    python -m app.db.migrate --database-url postgresql://... --status
+"""
+import argparse
+import asyncio
+import os
+import re
+from pathlib import Path
+from typing import List, Tuple
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[3] / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# Arbitrary key for pg_advisory_lock, shared by every run of this script.
+MIGRATION_LOCK_ID = 727_001
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+
+def find_migrations(directory: Path) -> List[Tuple[str, str, Path]]:
+    """Returns the (version, name, path) of every migration file, in order."""
+    migrations = []
+    for path in sorted(directory.iterdir()):
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append((match.group(1), match.group(2), path))
+    return migrations
+
+
+async def migrate(database_url: str, directory: Path = MIGRATIONS_DIR, status_only: bool = False) -> List[str]:
+    """Applies the pending migrations and returns their versions."""
+    import asyncpg
+
+    connection = await asyncpg.connect(database_url)
+    try:
+        await connection.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        await connection.execute(CREATE_MIGRATIONS_TABLE)
+        applied = {row["version"] for row in await connection.fetch("SELECT version FROM schema_migrations")}
+
+        newly_applied = []
+        for version, name, path in find_migrations(directory):
+            if version in applied:
+                print(f"{version} {name}: applied")
+                continue
+            if status_only:
+                print(f"{version} {name}: pending")
+                continue
+            async with connection.transaction():
+                await connection.execute(path.read_text())
+                await connection.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name
+                )
+            newly_applied.append(version)
+            print(f"{version} {name}: applied now")
+        return newly_applied
+    finally:
+        await connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="defaults to DATABASE_URL")
+    parser.add_argument("--dir", type=Path, default=MIGRATIONS_DIR, help="directory with the migration files")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying any")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url.")
+    asyncio.run(migrate(args.database_url, args.dir, status_only=args.status))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,113 @@
-from supabase import create_client, Client
+import asyncio
+import importlib.util
+from typing import Dict, Optional
+
+import httpx
+from supabase import acreate_client, AsyncClient
 from app.core.config import settings
+from app.core.metrics import InstrumentedTransport
+
+# The process-wide client. It is created once by the application lifespan
+# (see app/main.py) and shared by every request, so the underlying HTTP
+# connection pools and their keep-alive connections are reused instead of
+# being rebuilt on each call.
+_client: Optional[AsyncClient] = None
+# Held while the client is created, so concurrent first calls create only one.
+_client_lock = asyncio.Lock()
+
+
+def _build_http_client(timeout: float) -> httpx.AsyncClient:
+    """
+    Builds a pooled HTTP client using the connection settings.
+    HTTP/2 is only enabled when the `h2` package is installed. Every call
+    is recorded in the upstream metrics (see app/core/metrics.py).
+    """
+    http2 = settings.SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+    )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+        transport=InstrumentedTransport(transport),
+        follow_redirects=True,
+    )
 
-def get_supabase_client() -> Client:
+
+async def create_supabase_client() -> AsyncClient:
     """
-    Returns a Supabase client instance.
+    Creates a new async Supabase client backed by pooled HTTP clients.
 
-    Note: This is a simple implementation for demonstration. In a production
-    application, you might want to manage the client lifecycle more carefully,
-    for example, by creating a single client instance that is reused across
-    the application.
+    PostgREST and Storage each get their own HTTP client because the
+    Supabase sub-clients rewrite the base URL of the client they are given.
     """
     if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
         raise ValueError("Supabase URL and Key must be set in environment variables.")
 
-    supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-    return supabase
\ No newline at end of file
+    supabase: AsyncClient = await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    supabase._postgrest = supabase._init_postgrest_client(
+        rest_url=supabase.rest_url,
+        headers=supabase.options.headers,
+        schema=supabase.options.schema,
+        http_client=_build_http_client(settings.SUPABASE_TIMEOUT),
+    )
+    supabase._storage = supabase._init_storage_client(
+        storage_url=supabase.storage_url,
+        headers=supabase.options.headers,
+        http_client=_build_http_client(settings.SUPABASE_STORAGE_TIMEOUT),
+    )
+    return supabase
+
+
+async def init_supabase_client() -> AsyncClient:
+    """
+    Creates the shared client. Called once on application startup.
+    """
+    global _client
+    async with _client_lock:
+        if _client is None:
+            _client = await create_supabase_client()
+    return _client
+
+
+async def close_supabase_client() -> None:
+    """
+    Closes the pooled connections of the shared client. Called on shutdown.
+    """
+    global _client
+    if _client is None:
+        return
+    if _client._postgrest is not None:
+        await _client._postgrest.session.aclose()
+    if _client._storage is not None:
+        await _client._storage.session.aclose()
+    _client = None
+
+
+async def get_supabase_client() -> AsyncClient:
+    """
+    Returns the shared Supabase client instance.
+
+    The client is normally created by the application lifespan; it is created
+    lazily here for code paths that run outside of it (scripts, tests).
+    Concurrent first calls wait for the same client.
+    """
+    if _client is None:
+        return await init_supabase_client()
+    return _client
+
+
+def returning(query, columns: str, embedded_order: Optional[Dict[str, str]] = None):
+    """
+    Makes an insert, update or delete return `columns` of the affected rows,
+    embedded resources included, so a write never needs a follow-up read.
+    `embedded_order` orders embedded rows, e.g. {"content_cards": "id"}.
+    """
+    query.params = query.params.add("select", columns)
+    for table, column in (embedded_order or {}).items():
+        query.params = query.params.add(f"{table}.order", f"{column}.asc")
+    return query
@@ -1,9 +1,52 @@
+import importlib.util
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .core.config import settings
+from .core.metrics import MetricsMiddleware, metrics_endpoint
+from .core.query_budget import QueryBudgetMiddleware
 from .api.main import api_router
+from .db.supabase import init_supabase_client, close_supabase_client
+from .db.postgres import init_postgres, close_postgres
+from .services.invalidation_bus import invalidation_bus, build_transport
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-app = FastAPI(title=settings.PROJECT_NAME)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared Supabase client (and its connection pools) once per process.
+    await init_supabase_client()
+    # Direct Postgres pool for the hot paths (only when DATABASE_BACKEND=postgres).
+    await init_postgres()
+    # Keep in-process caches consistent with writes handled by other workers.
+    await invalidation_bus.start(build_transport())
+    yield
+    await invalidation_bus.stop()
+    await close_postgres()
+    await close_supabase_client()
+
+
+# Responses are serialized with orjson, which is much faster than the standard json module on large lists.
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Compress responses above a size threshold. Brotli is preferred when the
+# client accepts it and `brotli-asgi` is installed; otherwise gzip is used.
+if importlib.util.find_spec("brotli_asgi") is not None:
+    from brotli_asgi import BrotliMiddleware
+
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=settings.BROTLI_QUALITY,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_COMPRESSION_LEVEL,
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,10 +54,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Cursor"],
 )
 
+# Count upstream calls per request (staging and CI; see app/core/query_budget.py).
+if settings.QUERY_BUDGET_MODE:
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Outermost, so request latency includes the other middleware (compression, CORS).
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
-def read_root():
-    return {"message": "Welcome to the Ghars Project API"}
\ No newline at end of file
+async def read_root():
+    return {"message": "Welcome to the Ghars Project API"}
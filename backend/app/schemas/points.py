@@ -1,4 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
+from typing import Optional, List
 
 class PointsAdd(BaseModel):
-    points: int
\ No newline at end of file
+    points: int
+
+class StudentPointsAdd(PointsAdd):
+    student_id: int
+
+class PointsBulkAdd(BaseModel):
+    """
+    Either `class_id` with `points` (award every student of the class),
+    or `students` with per-student awards.
+    """
+    class_id: Optional[int] = None
+    points: Optional[int] = None
+    students: Optional[List[StudentPointsAdd]] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if self.students is not None:
+            if self.class_id is not None or self.points is not None:
+                raise ValueError("Provide either 'students' or 'class_id' with 'points', not both.")
+        elif self.class_id is None or self.points is None:
+            raise ValueError("Provide 'students', or 'class_id' with 'points'.")
+        return self
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from .class_schema import Class
 
 class UserBase(BaseModel):
@@ -27,6 +27,29 @@ class UserInDBBase(UserBase):
 class User(UserInDBBase):
     pass
 
+# Student listings can return a subset of the fields (`fields=`), so every field is optional.
+class UserPartial(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    points: Optional[int] = None
+    class_id: Optional[int] = None
+    role: Optional[str] = None
+    class_info: Optional[Class] = Field(None, alias='class')
+
+    class Config:
+        from_attributes = True
+
+class LeaderboardEntryPartial(UserPartial):
+    rank: Optional[int] = None
+
+class StudentImportError(BaseModel):
+    row: int
+    error: str
+
+class StudentImportReport(BaseModel):
+    created: int
+    errors: List[StudentImportError] = []
+
 class AdminBase(BaseModel):
     name: str
     can_manage_admins: bool = True
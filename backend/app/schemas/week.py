@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 # Content Card Schemas
@@ -47,4 +47,19 @@ class WeekInDB(WeekBase):
         from_attributes = True
 
 class Week(WeekInDB):
-    pass
\ No newline at end of file
+    pass
+
+
+# Resumable Video Upload Schemas
+class VideoUploadCreate(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    size: int = Field(..., gt=0)
+
+class VideoUploadStatus(BaseModel):
+    upload_id: str
+    offset: int
+    size: int
+    chunk_size: Optional[int] = None
+    complete: bool = False
+    week: Optional[Week] = None
@@ -1,38 +1,45 @@
-from supabase import Client
+from supabase import AsyncClient
 from typing import List, Optional, Dict, Any
 from app.schemas.user import AdminCreate, AdminUpdate
 from app.db.supabase import get_supabase_client
+from app.services.cache_invalidation import admin_changed
 from fastapi import Depends
 
 class AdminService:
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: AsyncClient):
         self.db = db_client
         self.table = "admins"
 
-    def create_admin(self, admin_in: AdminCreate) -> Optional[Dict[str, Any]]:
+    async def create_admin(self, admin_in: AdminCreate) -> Optional[Dict[str, Any]]:
         admin_data = admin_in.model_dump()
-        response = self.db.table(self.table).insert(admin_data).execute()
+        # The insert returns the whole new row, so no refetch is needed.
+        response = await self.db.table(self.table).insert(admin_data).execute()
         if response.data:
             admin = response.data[0]
-            return self.get_admin_by_id(admin['id'])
+            admin['role'] = 'admin'
+            return admin
         return None
 
-    def get_admin_by_id(self, admin_id: int) -> Optional[Dict[str, Any]]:
-        response = self.db.table(self.table).select("*").eq("id", admin_id).single().execute()
-        if response.data:
+    async def get_admin_by_id(self, admin_id: int) -> Optional[Dict[str, Any]]:
+        response = await self.db.table(self.table).select("*").eq("id", admin_id).maybe_single().execute()
+        if response and response.data:
             admin = response.data
             admin['role'] = 'admin'
             return admin
         return None
 
-    def get_all_admins(self) -> List[Dict[str, Any]]:
-        response = self.db.table(self.table).select("*").execute()
+    async def get_all_admins(self) -> List[Dict[str, Any]]:
+        response = await self.db.table(self.table).select("*").execute()
         admins = response.data if response.data else []
         for admin in admins:
             admin['role'] = 'admin'
         return admins
 
-    def update_admin(self, admin_id: int, admin_in: AdminUpdate) -> Optional[Dict[str, Any]]:
+    async def update_admin(self, admin_id: int, admin_in: AdminUpdate) -> Optional[Dict[str, Any]]:
+        """
+        Updates an admin and returns the updated row from the update itself.
+        Returns None if the admin does not exist.
+        """
         update_data = admin_in.model_dump(exclude_unset=True)
 
         # Don't update password if it's not provided or is an empty string
@@ -40,15 +47,23 @@ class AdminService:
             update_data.pop('password')
 
         if not update_data:
-            return self.get_admin_by_id(admin_id)
+            return await self.get_admin_by_id(admin_id)
 
-        response = self.db.table(self.table).update(update_data).eq("id", admin_id).execute()
+        response = await self.db.table(self.table).update(update_data).eq("id", admin_id).execute()
         if response.data:
-            return self.get_admin_by_id(admin_id)
+            admin = response.data[0]
+            admin['role'] = 'admin'
+            admin_changed(admin_id)
+            return admin
         return None
 
-    def delete_admin(self, admin_id: int) -> None:
-        self.db.table(self.table).delete().eq("id", admin_id).execute()
+    async def delete_admin(self, admin_id: int) -> Optional[Dict[str, Any]]:
+        """Deletes an admin. Returns the deleted row, or None if the admin does not exist."""
+        response = await self.db.table(self.table).delete().eq("id", admin_id).execute()
+        if response.data:
+            admin_changed(admin_id)
+            return response.data[0]
+        return None
 
-def get_admin_service(db: Client = Depends(get_supabase_client)) -> AdminService:
+async def get_admin_service(db: AsyncClient = Depends(get_supabase_client)) -> AdminService:
     return AdminService(db)
\ No newline at end of file
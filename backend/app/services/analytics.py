@@ -1,123 +1,257 @@
-import os
+import asyncio
+import time
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
-from google.analytics.data_v1beta.types import RunReportRequest, Dimension, Metric, DateRange, RunRealtimeReportRequest
+from google.analytics.data_v1beta.types import BatchRunReportsRequest, RunReportRequest, Dimension, Metric, DateRange, RunRealtimeReportRequest
 from app.core.config import settings
-from concurrent.futures import ThreadPoolExecutor
+from app.core.metrics import track_upstream
+
 
-def get_analytics_report():
+class StaleWhileRevalidateCache:
     """
-    Authenticates with Google Analytics and fetches a comprehensive set of reports.
+    Caches the result of a blocking `fetch` function for `ttl` seconds.
+
+    The first call waits for the fetch. After that a stale value is returned
+    immediately while a single background task refreshes it, so callers never
+    wait on the upstream service once the cache is warm. If a refresh fails
+    the stale value is kept.
     """
-    try:
-        if not all([settings.GA4_PROJECT_ID, settings.GA4_CLIENT_EMAIL, settings.GA4_PRIVATE_KEY]):
-            return {"error": "Google Analytics is not fully configured."}
 
-        creds_json = {
-            "type": "service_account",
-            "project_id": settings.GA4_PROJECT_ID,
-            "private_key": settings.GA4_PRIVATE_KEY.replace('\\n', '\n'),
-            "client_email": settings.GA4_CLIENT_EMAIL,
-            "token_uri": "https://oauth2.googleapis.com/token",
-        }
+    def __init__(self, fetch: Callable[[], Any], ttl: float):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._loading: Optional[asyncio.Task] = None
 
-        client = BetaAnalyticsDataClient.from_service_account_info(creds_json)
-        property_id = f"properties/{settings.GA_PROPERTY_ID}"
-        date_range = [DateRange(start_date="28daysAgo", end_date="today")]
-
-        # Define all report requests
-        requests = {
-            "total_users": RunReportRequest(
-                property=property_id,
-                metrics=[Metric(name="activeUsers")],
-                date_ranges=date_range,
-            ),
-            "users_per_day": RunReportRequest(
-                property=property_id,
-                dimensions=[Dimension(name="date")],
-                metrics=[Metric(name="activeUsers")],
-                date_ranges=date_range,
-                order_bys=[{"dimension": {"dimension_name": "date"}, "desc": False}]
-            ),
-            "users_per_week": RunReportRequest(
-                property=property_id,
-                dimensions=[Dimension(name="week")],
-                metrics=[Metric(name="activeUsers")],
-                date_ranges=date_range,
-                 order_bys=[{"dimension": {"dimension_name": "week"}, "desc": False}]
-            ),
-            "content_by_page": RunReportRequest(
-                property=property_id,
-                dimensions=[Dimension(name="unifiedScreenName")],
-                metrics=[Metric(name="screenPageViews"), Metric(name="sessions")],
-                date_ranges=date_range,
-                limit=50 # Return more pages
-            ),
-        }
+    def is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl
+
+    async def _refresh(self) -> Any:
+        try:
+            self._value = await run_in_threadpool(self.fetch)
+            self._fetched_at = time.monotonic()
+            return self._value
+        finally:
+            self._loading = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._loading is None:
+            self._loading = asyncio.create_task(self._refresh())
+            self._loading.add_done_callback(self._log_refresh_error)
+        return self._loading
+
+    async def get(self) -> Any:
+        if self._fetched_at is None:
+            # Nothing cached yet: wait for the (shared) first fetch.
+            return await asyncio.shield(self._start_refresh())
+        if self.is_stale():
+            self._start_refresh()
+        return self._value
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing Google Analytics data: {task.exception()}")
+
+
+@lru_cache(maxsize=1)
+def get_analytics_client() -> BetaAnalyticsDataClient:
+    """
+    Returns the long-lived Google Analytics client, created on first use.
+    """
+    creds_json = {
+        "type": "service_account",
+        "project_id": settings.GA4_PROJECT_ID,
+        "private_key": settings.GA4_PRIVATE_KEY.replace('\\n', '\n'),
+        "client_email": settings.GA4_CLIENT_EMAIL,
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+    return BetaAnalyticsDataClient.from_service_account_info(creds_json)
+
+
+# Historical reports: where each one goes in the final report and how its metrics are renamed.
+HISTORICAL_REPORTS = {
+    "total_users": {
+        "metrics": ["activeUsers"],
+        "section": "overview",
+        "key": "totalUsers",
+    },
+    "users_per_day": {
+        "dimensions": ["date"],
+        "metrics": ["activeUsers"],
+        "order_by": "date",
+        "section": "trends",
+        "key": "usersPerDay",
+        "metric_names": {"activeUsers": "users"},
+    },
+    "users_per_week": {
+        "dimensions": ["week"],
+        "metrics": ["activeUsers"],
+        "order_by": "week",
+        "section": "trends",
+        "key": "usersPerWeek",
+        "metric_names": {"activeUsers": "users"},
+    },
+    "content_by_page": {
+        "dimensions": ["unifiedScreenName"],
+        "metrics": ["screenPageViews", "sessions"],
+        "limit": 50, # Return more pages
+        "section": "content",
+        "key": "byPage",
+        "metric_names": {"screenPageViews": "views", "sessions": "sessions"},
+    },
+}
+REALTIME_REPORT = "realtime"
+REPORT_NAMES = [*HISTORICAL_REPORTS, REALTIME_REPORT]
+
+
+def build_report_request(name: str, property_id: str, start_date: str, end_date: str) -> RunReportRequest:
+    report = HISTORICAL_REPORTS[name]
+    request = RunReportRequest(
+        property=property_id,
+        dimensions=[Dimension(name=dimension) for dimension in report.get("dimensions", [])],
+        metrics=[Metric(name=metric) for metric in report["metrics"]],
+        date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
+    )
+    if "order_by" in report:
+        request.order_bys = [{"dimension": {"dimension_name": report["order_by"]}, "desc": False}]
+    if "limit" in report:
+        request.limit = report["limit"]
+    return request
+
+
+def process_dimensional_report(response, value_metric_names_map):
+    """
+    Turns a report response into a list of rows keyed by dimension name and
+    (renamed) metric name. Supports any number of dimensions.
+    """
+    data = []
+    if not response or not response.rows:
+        return data
+    for row in response.rows:
+        item = {header.name: row.dimension_values[i].value for i, header in enumerate(response.dimension_headers)}
+        for i, metric_header in enumerate(response.metric_headers):
+            output_key = value_metric_names_map.get(metric_header.name, metric_header.name)
+            item[output_key] = row.metric_values[i].value
+        data.append(item)
+    return data
+
+
+def fetch_historical_report(
+    start_date: str = "28daysAgo",
+    end_date: str = "today",
+    report_names: Sequence[str] = tuple(HISTORICAL_REPORTS),
+    client: Optional[BetaAnalyticsDataClient] = None,
+) -> Dict[str, Any]:
+    """
+    Fetches the requested historical reports in a single batch call and processes them.
+    """
+    client = client or get_analytics_client()
+    property_id = f"properties/{settings.GA_PROPERTY_ID}"
+
+    # Process results into a single structured report
+    final_report = {
+        "overview": {},
+        "trends": {"usersPerDay": [], "usersPerWeek": []},
+        "content": {"byPage": []},
+    }
+    if not report_names:
+        return final_report
 
-        # Define realtime request separately
-        realtime_request = RunRealtimeReportRequest(
+    # All historical reports go in one batchRunReports call; responses keep the request order.
+    with track_upstream("google_analytics", "historical", "batch_run_reports"):
+        batch_response = client.batch_run_reports(BatchRunReportsRequest(
             property=property_id,
+            requests=[build_report_request(name, property_id, start_date, end_date) for name in report_names],
+        ))
+
+    for name, response in zip(report_names, batch_response.reports):
+        report = HISTORICAL_REPORTS[name]
+        if report["section"] == "overview":
+            if response.rows:
+                final_report["overview"][report["key"]] = response.rows[0].metric_values[0].value
+        else:
+            final_report[report["section"]][report["key"]] = process_dimensional_report(
+                response, report.get("metric_names", {})
+            )
+
+    return final_report
+
+
+def fetch_realtime_overview(client: Optional[BetaAnalyticsDataClient] = None) -> Dict[str, Any]:
+    """
+    Fetches the realtime metrics shown in the report overview.
+    """
+    client = client or get_analytics_client()
+    with track_upstream("google_analytics", "realtime", "run_realtime_report"):
+        realtime_res = client.run_realtime_report(RunRealtimeReportRequest(
+            property=f"properties/{settings.GA_PROPERTY_ID}",
             metrics=[Metric(name="activeUsers"), Metric(name="screenPageViews")]
-        )
+        ))
 
-        # Run reports in parallel
-        with ThreadPoolExecutor() as executor:
-            # Historical reports
-            future_to_report = {executor.submit(client.run_report, request): name for name, request in requests.items()}
-            # Realtime report
-            future_to_report[executor.submit(client.run_realtime_report, realtime_request)] = "realtime"
+    overview = {}
+    if realtime_res and realtime_res.rows:
+        for i, header in enumerate(realtime_res.metric_headers):
+            metric_name = header.name
+            # The realtime API uses 'screenViews', but the historical API (and thus frontend) uses 'screenPageViews'
+            if metric_name == "screenViews":
+                metric_name = "screenPageViews"
+            overview[metric_name] = realtime_res.rows[0].metric_values[i].value
+    return overview
 
-            results = {report_name: future.result() for future, report_name in future_to_report.items()}
 
-        # Process results into a single structured report
-        final_report = {
-            "overview": {},
-            "trends": {"usersPerDay": [], "usersPerWeek": []},
-            "content": {"byPage": []},
-        }
+# One cache per (date range, reports) combination, oldest evicted first.
+MAX_CACHED_REPORTS = 32
+historical_report_caches: Dict[Tuple[str, str, Tuple[str, ...]], StaleWhileRevalidateCache] = {}
+realtime_overview_cache = StaleWhileRevalidateCache(fetch_realtime_overview, ttl=settings.ANALYTICS_REALTIME_CACHE_TTL)
 
-        # Process Realtime Overview Data
-        realtime_res = results.get("realtime")
-        if realtime_res and realtime_res.rows:
-            for i, header in enumerate(realtime_res.metric_headers):
-                metric_name = header.name
-                # The realtime API uses 'screenViews', but the historical API (and thus frontend) uses 'screenPageViews'
-                if metric_name == "screenViews":
-                    metric_name = "screenPageViews"
-                value = realtime_res.rows[0].metric_values[i].value
-                final_report["overview"][metric_name] = value
-
-        # Process Total Users
-        total_users_res = results.get("total_users")
-        if total_users_res and total_users_res.rows:
-            final_report["overview"]["totalUsers"] = total_users_res.rows[0].metric_values[0].value
-
-        # Helper to process dimensional reports
-        def process_dimensional_report(response, key_dim_name, value_metric_names_map):
-            data = []
-            if not response or not response.rows:
-                return data
-            for row in response.rows:
-                item = {key_dim_name: row.dimension_values[0].value}
-                for i, metric_header in enumerate(response.metric_headers):
-                    output_key = value_metric_names_map.get(metric_header.name, metric_header.name)
-                    item[output_key] = row.metric_values[i].value
-                data.append(item)
-            return data
-
-        # Process dimensional reports
-        final_report["content"]["byPage"] = process_dimensional_report(
-            results.get("content_by_page"), "unifiedScreenName", {"screenPageViews": "views", "sessions": "sessions"}
-        )
-        final_report["trends"]["usersPerDay"] = process_dimensional_report(
-            results.get("users_per_day"), "date", {"activeUsers": "users"}
-        )
-        final_report["trends"]["usersPerWeek"] = process_dimensional_report(
-            results.get("users_per_week"), "week", {"activeUsers": "users"}
+
+def get_historical_report_cache(start_date: str, end_date: str, report_names: Tuple[str, ...]) -> StaleWhileRevalidateCache:
+    key = (start_date, end_date, report_names)
+    if key not in historical_report_caches:
+        if len(historical_report_caches) >= MAX_CACHED_REPORTS:
+            historical_report_caches.pop(next(iter(historical_report_caches)))
+        historical_report_caches[key] = StaleWhileRevalidateCache(
+            partial(fetch_historical_report, start_date, end_date, report_names),
+            ttl=settings.ANALYTICS_CACHE_TTL,
         )
+    return historical_report_caches[key]
 
-        return final_report
+
+async def get_analytics_report(
+    start_date: str = "28daysAgo",
+    end_date: str = "today",
+    report_names: Optional[Sequence[str]] = None,
+):
+    """
+    Returns the requested Google Analytics reports (all of them by default)
+    for the given date range.
+
+    Historical and realtime data are cached separately (ANALYTICS_CACHE_TTL and
+    ANALYTICS_REALTIME_CACHE_TTL). Stale data is served immediately while it is
+    refreshed in the background.
+    """
+    try:
+        if not all([settings.GA4_PROJECT_ID, settings.GA4_CLIENT_EMAIL, settings.GA4_PRIVATE_KEY]):
+            return {"error": "Google Analytics is not fully configured."}
+
+        requested = REPORT_NAMES if report_names is None else report_names
+        historical_names = tuple(name for name in HISTORICAL_REPORTS if name in requested)
+
+        historical_report = get_historical_report_cache(start_date, end_date, historical_names).get()
+        if REALTIME_REPORT in requested:
+            historical, realtime = await asyncio.gather(historical_report, realtime_overview_cache.get())
+        else:
+            historical, realtime = await historical_report, {}
+        return {
+            **historical,
+            "overview": {**realtime, **historical["overview"]},
+        }
 
     except Exception as e:
         print(f"Error fetching Google Analytics data: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
@@ -0,0 +1,91 @@
+"""
+Invalidation of the in-process caches after writes.
+
+Services call these functions after changing data. Each one updates this
+worker's caches and publishes the change on the invalidation bus, whose
+handlers (registered below) apply the same update in every other worker.
+
+Messages carry no ordering across workers, so two writes to one student
+can reach workers in different orders. Student rows therefore carry their
+database `version`, and the leaderboard cache keeps the newest copy it has
+seen, whatever order the copies arrive in (see LeaderboardCache).
+
+The token cache needs no invalidation: it only holds the claims signed into
+each token, which never change.
+"""
+from typing import Any, Dict, List
+
+from app.services.content_versions import content_versions, WEEKS
+from app.services.invalidation_bus import invalidation_bus
+from app.services.leaderboard_cache import leaderboard_cache
+from app.services.profile_cache import profile_cache
+
+
+def _apply_weeks_changed(data: Dict[str, Any]) -> None:
+    content_versions.bump(WEEKS)
+
+
+def _apply_students_changed(data: Dict[str, Any]) -> None:
+    leaderboard_cache.upsert_many(data["students"])
+    for student in data["students"]:
+        profile_cache.invalidate("student", student["id"])
+
+
+def _apply_student_removed(data: Dict[str, Any]) -> None:
+    leaderboard_cache.remove(data["id"])
+    profile_cache.invalidate("student", data["id"])
+
+
+def _apply_all_students_changed(data: Dict[str, Any]) -> None:
+    # Student rows embed their class, so class changes also land here.
+    leaderboard_cache.invalidate()
+    profile_cache.clear()
+
+
+def _apply_admin_changed(data: Dict[str, Any]) -> None:
+    profile_cache.invalidate("admin", data["id"])
+
+
+def _apply_everything_changed() -> None:
+    _apply_weeks_changed({})
+    _apply_all_students_changed({})
+
+
+invalidation_bus.register("weeks", _apply_weeks_changed)
+invalidation_bus.register("students", _apply_students_changed)
+invalidation_bus.register("student_removed", _apply_student_removed)
+invalidation_bus.register("all_students", _apply_all_students_changed)
+invalidation_bus.register("admin", _apply_admin_changed)
+invalidation_bus.register_reset(_apply_everything_changed)
+
+
+def weeks_changed() -> None:
+    """A week or one of its content cards was created, changed or deleted."""
+    _apply_weeks_changed({})
+    invalidation_bus.publish("weeks")
+
+
+def students_changed(students: List[Dict[str, Any]]) -> None:
+    """Students were created or changed; `students` are their current rows, with their `version`."""
+    data = {"students": students}
+    _apply_students_changed(data)
+    # Too many rows for one message: other workers rebuild their leaderboard instead.
+    invalidation_bus.publish("students", data, fallback_topic="all_students")
+
+
+def student_removed(student_id: int) -> None:
+    data = {"id": student_id}
+    _apply_student_removed(data)
+    invalidation_bus.publish("student_removed", data)
+
+
+def classes_changed() -> None:
+    """A class was renamed or deleted, which changes every student in it."""
+    _apply_all_students_changed({})
+    invalidation_bus.publish("all_students")
+
+
+def admin_changed(admin_id: int) -> None:
+    data = {"id": admin_id}
+    _apply_admin_changed(data)
+    invalidation_bus.publish("admin", data)
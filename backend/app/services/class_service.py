@@ -1,38 +1,42 @@
-from supabase import Client
+from supabase import AsyncClient
 from typing import List, Optional, Dict, Any
 from app.schemas.class_schema import ClassCreate, ClassUpdate
+from app.services.cache_invalidation import classes_changed
 
 class ClassService:
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: AsyncClient):
         self.db = db_client
         self.table = "classes"
 
-    def create_class(self, class_in: ClassCreate) -> Optional[Dict[str, Any]]:
+    async def create_class(self, class_in: ClassCreate) -> Optional[Dict[str, Any]]:
         """Creates a new class in the database."""
         class_data = class_in.model_dump()
-        response = self.db.table(self.table).insert(class_data).execute()
+        response = await self.db.table(self.table).insert(class_data).execute()
         if response.data:
             return response.data[0]
         return None
 
-    def get_all_classes(self) -> List[Dict[str, Any]]:
+    async def get_all_classes(self) -> List[Dict[str, Any]]:
         """Retrieves all classes from the database."""
-        response = self.db.table(self.table).select("*").execute()
+        response = await self.db.table(self.table).select("*").execute()
         return response.data if response.data else []
 
-    def update_class(self, class_id: int, class_in: ClassUpdate) -> Optional[Dict[str, Any]]:
+    async def update_class(self, class_id: int, class_in: ClassUpdate) -> Optional[Dict[str, Any]]:
         """Updates a class's information."""
         update_data = class_in.model_dump(exclude_unset=True)
         if not update_data:
             return None # Nothing to update
-        response = self.db.table(self.table).update(update_data).eq("id", class_id).execute()
+        response = await self.db.table(self.table).update(update_data).eq("id", class_id).execute()
         if response.data:
+            # Leaderboard entries and student profiles embed the class name.
+            classes_changed()
             return response.data[0]
         return None
 
-    def delete_class(self, class_id: int) -> Optional[Dict[str, Any]]:
-        """Deletes a class from the database."""
-        response = self.db.table(self.table).delete().eq("id", class_id).execute()
+    async def delete_class(self, class_id: int) -> Optional[Dict[str, Any]]:
+        """Deletes a class from the database. Returns None if it does not exist."""
+        response = await self.db.table(self.table).delete().eq("id", class_id).execute()
         if response.data:
+            classes_changed()
             return response.data[0]
         return None
\ No newline at end of file
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+WEEKS = "weeks"
+LEADERBOARD = "leaderboard"
+
+
+class ContentVersions:
+    """
+    Tracks which version of each public resource clients have been served.
+
+    Every namespace (weeks, leaderboard) has a version number that services
+    bump whenever they change its data. The ETag of each response is a hash of
+    its body, remembered per (namespace, key) until the next bump, so a
+    matching If-None-Match can be answered without touching the database.
+    ETags are derived from content, so they are stable across workers and
+    restarts.
+
+    Keys come from request parameters, so at most `maxsize` ETags are kept,
+    least recently used first out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._etags: "OrderedDict[Tuple[str, Hashable], str]" = OrderedDict()
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def version(self, namespace: str) -> int:
+        return self._versions[namespace]
+
+    def bump(self, namespace: str) -> None:
+        """Marks the namespace as changed and forgets its remembered ETags."""
+        with self._lock:
+            self._versions[namespace] += 1
+            self._etags = OrderedDict((key, etag) for key, etag in self._etags.items() if key[0] != namespace)
+
+    def get_etag(self, namespace: str, key: Hashable) -> Optional[str]:
+        with self._lock:
+            etag = self._etags.get((namespace, key))
+            if etag is not None:
+                self._etags.move_to_end((namespace, key))
+            return etag
+
+    def set_etag(self, namespace: str, key: Hashable, version: int, etag: str) -> None:
+        """
+        Remembers the ETag of a response built at `version`. It is dropped if
+        the namespace changed while the response was being built.
+        """
+        with self._lock:
+            if self.maxsize > 0 and self._versions[namespace] == version:
+                self._etags[(namespace, key)] = etag
+                self._etags.move_to_end((namespace, key))
+                while len(self._etags) > self.maxsize:
+                    self._etags.popitem(last=False)
+
+
+content_versions = ContentVersions(maxsize=settings.ETAG_CACHE_SIZE)
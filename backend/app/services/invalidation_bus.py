@@ -0,0 +1,334 @@
+import asyncio
+import fcntl
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import orjson
+
+from app.core.config import settings
+
+# Seconds between attempts to (re)connect a transport.
+RECONNECT_DELAY = 1.0
+
+
+class InvalidationTransport:
+    """
+    Carries invalidation messages between the workers of a deployment.
+
+    `on_message` is called with every message published by any worker
+    (possibly including this one). `on_reset` is called after a connection
+    was lost and restored, since messages may have been missed meanwhile.
+    """
+
+    # Largest message the transport can carry (None if unlimited).
+    max_message_size: Optional[int] = None
+
+    async def start(self, on_message: Callable[[bytes], None], on_reset: Callable[[], None]) -> None:
+        raise NotImplementedError
+
+    async def publish(self, message: bytes) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        pass
+
+
+class MemoryTransport(InvalidationTransport):
+    """
+    Delivers messages to every MemoryTransport sharing the same hub in this
+    process. Used in tests to stand in for several workers.
+    """
+
+    default_hub: List["MemoryTransport"] = []
+
+    def __init__(self, hub: Optional[List["MemoryTransport"]] = None):
+        self.hub = self.default_hub if hub is None else hub
+        self._on_message: Optional[Callable[[bytes], None]] = None
+
+    async def start(self, on_message: Callable[[bytes], None], on_reset: Callable[[], None]) -> None:
+        self._on_message = on_message
+        self.hub.append(self)
+
+    async def publish(self, message: bytes) -> None:
+        for transport in list(self.hub):
+            transport._on_message(message)
+
+    async def stop(self) -> None:
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class UnixSocketTransport(InvalidationTransport):
+    """
+    Single-host transport over a Unix socket.
+
+    One worker (whichever holds the lock file) runs a small broker that relays
+    each line it receives to every connected worker; all workers, the broker
+    included, connect to it as clients. If the broker's worker exits, the
+    lock is released and the next worker to reconnect takes over.
+    """
+
+    # Clients whose unsent backlog exceeds this are disconnected (they resync on reconnect).
+    MAX_CLIENT_BACKLOG = 1024 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_message: Callable[[bytes], None], on_reset: Callable[[], None]) -> None:
+        self._on_message = on_message
+        self._on_reset = on_reset
+        self._task = asyncio.create_task(self._run())
+
+    async def _become_broker(self) -> None:
+        if self._server is not None:
+            return
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        self._lock_file = lock_file
+        # A socket file left behind by a previous broker is stale once we hold the lock.
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve_client, self.path)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while line := await reader.readline():
+                for client in list(self._clients):
+                    if client.transport.get_write_buffer_size() > self.MAX_CLIENT_BACKLOG:
+                        self._clients.discard(client)
+                        client.close()
+                    else:
+                        client.write(line)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                await self._become_broker()
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            self._writer = writer
+            self._connected.set()
+            if connected_before:
+                self._on_reset()
+            connected_before = True
+            try:
+                while line := await reader.readline():
+                    self._on_message(line.rstrip(b"\n"))
+            except ConnectionError:
+                pass
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def publish(self, message: bytes) -> None:
+        await self._connected.wait()
+        self._writer.write(message + b"\n")
+        await self._writer.drain()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+            for client in list(self._clients):
+                client.close()
+            # Let the relay tasks see their connections close.
+            await asyncio.sleep(0)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._lock_file.close()
+
+
+class PostgresTransport(InvalidationTransport):
+    """
+    Multi-host transport over Postgres LISTEN/NOTIFY (requires `asyncpg`).
+
+    The DSN must be a direct or session-mode connection: transaction-mode
+    poolers do not deliver notifications.
+    """
+
+    # NOTIFY payloads must be shorter than 8000 bytes.
+    max_message_size = 7999
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._connection = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, on_message: Callable[[bytes], None], on_reset: Callable[[], None]) -> None:
+        self._on_message = on_message
+        self._on_reset = on_reset
+        await self._connect()
+
+    async def _connect(self) -> None:
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("The postgres invalidation transport requires the asyncpg package.")
+
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._notified)
+        self._connection.add_termination_listener(self._connection_lost)
+
+    def _notified(self, connection, pid: int, channel: str, payload: str) -> None:
+        self._on_message(payload.encode())
+
+    def _connection_lost(self, connection) -> None:
+        if self._reconnecting is None and not self._stopping:
+            self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            while True:
+                try:
+                    await self._connect()
+                    break
+                except Exception as e:
+                    print(f"Cache invalidation: reconnecting to Postgres failed: {e}")
+                    await asyncio.sleep(RECONNECT_DELAY)
+            self._on_reset()
+        finally:
+            self._reconnecting = None
+
+    async def publish(self, message: bytes) -> None:
+        await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, message.decode())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+
+
+class InvalidationBus:
+    """
+    Broadcasts cache invalidations to the other workers of a deployment.
+
+    Services publish a topic and its data after every write; every other
+    worker then runs the handler registered for that topic against its own
+    in-process caches. Messages from this worker are ignored on receipt, as
+    its caches were already updated by the write itself. Publishing never
+    blocks the request: messages are queued and sent in order by a
+    background task. Without a transport (a single worker), publishing does
+    nothing.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.transport: Optional[InvalidationTransport] = None
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    def register(self, topic: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        self._handlers[topic] = handler
+
+    def register_reset(self, handler: Callable[[], None]) -> None:
+        """Registers a handler run when messages may have been missed."""
+        self._reset_handlers.append(handler)
+
+    async def start(self, transport: Optional[InvalidationTransport]) -> None:
+        if transport is None:
+            return
+        self.transport = transport
+        self._outbox = asyncio.Queue()
+        await transport.start(self._receive, self._reset)
+        self._sender = asyncio.create_task(self._send())
+
+    async def stop(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        if self.transport is not None:
+            await self.transport.stop()
+            self.transport = None
+
+    def _encode(self, topic: str, data: Dict[str, Any]) -> bytes:
+        return orjson.dumps({"origin": self.origin, "topic": topic, "data": data})
+
+    def publish(self, topic: str, data: Optional[Dict[str, Any]] = None, fallback_topic: Optional[str] = None) -> None:
+        """
+        Queues a message for the other workers. If it is too large for the
+        transport, `fallback_topic` (with no data) is sent instead.
+        """
+        if self.transport is None:
+            return
+        message = self._encode(topic, data or {})
+        limit = self.transport.max_message_size
+        if limit is not None and len(message) > limit:
+            if fallback_topic is None:
+                raise ValueError(f"Invalidation message for '{topic}' is too large for the transport")
+            message = self._encode(fallback_topic, {})
+        self._outbox.put_nowait(message)
+
+    async def _send(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self.transport.publish(message)
+            except Exception as e:
+                print(f"Cache invalidation: publishing failed: {e}")
+
+    def _receive(self, raw: bytes) -> None:
+        try:
+            message = orjson.loads(raw)
+            if message["origin"] == self.origin:
+                return
+            handler = self._handlers.get(message["topic"])
+            if handler is not None:
+                handler(message["data"])
+        except Exception as e:
+            print(f"Cache invalidation: could not apply message: {e}")
+
+    def _reset(self) -> None:
+        for handler in self._reset_handlers:
+            handler()
+
+
+def build_transport() -> Optional[InvalidationTransport]:
+    """Returns the transport selected by INVALIDATION_TRANSPORT (None to disable the bus)."""
+    transport = settings.INVALIDATION_TRANSPORT
+    if not transport:
+        return None
+    if transport == "memory":
+        return MemoryTransport()
+    if transport == "unix":
+        return UnixSocketTransport(settings.INVALIDATION_SOCKET_PATH)
+    if transport == "postgres":
+        dsn = settings.INVALIDATION_DATABASE_URL or settings.DATABASE_URL
+        if not dsn:
+            raise ValueError("INVALIDATION_DATABASE_URL or DATABASE_URL must be set to use the postgres invalidation transport.")
+        return PostgresTransport(dsn, settings.INVALIDATION_CHANNEL)
+    raise ValueError(f"Unknown INVALIDATION_TRANSPORT '{transport}'. Use postgres, unix or memory.")
+
+
+invalidation_bus = InvalidationBus()
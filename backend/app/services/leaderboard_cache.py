@@ -0,0 +1,279 @@
+import asyncio
+import bisect
+import itertools
+import threading
+from typing import Awaitable, Callable, List, Optional, Dict, Any, Set, Tuple
+
+from app.services.content_versions import content_versions, LEADERBOARD
+
+
+class LeaderboardCache:
+    """
+    In-process, ranked copy of the public leaderboard.
+
+    Students are kept sorted by (points desc, id) together with their
+    precomputed rank, so reads are a slice of an in-memory list. The cache is
+    built once from the database and then kept up to date by StudentService
+    on every write (write-through). Every write also bumps the leaderboard
+    content version, which invalidates the ETags handed out to clients.
+
+    Rows carry the `version` of the database row. Write results can arrive
+    out of order (two concurrent point awards, or messages from other
+    workers), so an older copy of a student never replaces a newer one, and
+    a removed student is never added back.
+    Concurrent reads of an empty cache share a single load, and writes that
+    land while that load is in flight are applied on top of its result.
+
+    Listeners registered with add_listener are told about every change: a
+    "delta" event with the students whose points or rank changed (and the ids
+    of removed students), or a "reset" event when the cache is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Sort keys (-points, id), kept in leaderboard order.
+        self._keys: List[Tuple[int, int]] = []
+        # Ranks aligned with self._keys. Tied students share a rank (1, 2, 2, 4).
+        self._ranks: List[int] = []
+        self._rank_by_id: Dict[int, int] = {}
+        self._students: Dict[int, Dict[str, Any]] = {}
+        self._versions: Dict[int, int] = {}
+        # Ids of students deleted since the last load. Ids are never reused, so any later copy of them is stale.
+        self._removed: Set[int] = set()
+        # Bumped by invalidate(), so a load that started before it is dropped.
+        self._generation = 0
+        self._loading: Optional[asyncio.Task] = None
+        # Rows written while a load is in flight (None for removed students).
+        self._collecting = False
+        self._pending: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _key(student: Dict[str, Any]) -> Tuple[int, int]:
+        return (-(student.get("points") or 0), student["id"])
+
+    def _rerank(self) -> Set[int]:
+        """Recomputes the ranks and returns the ids of students whose rank changed."""
+        ranks = []
+        rank_by_id = {}
+        previous_points = None
+        for position, (negative_points, student_id) in enumerate(self._keys, start=1):
+            if negative_points != previous_points:
+                rank = position
+                previous_points = negative_points
+            ranks.append(rank)
+            rank_by_id[student_id] = rank
+        changed = {student_id for student_id, rank in rank_by_id.items() if self._rank_by_id.get(student_id) != rank}
+        self._ranks = ranks
+        self._rank_by_id = rank_by_id
+        return changed
+
+    @staticmethod
+    def _is_older(student: Dict[str, Any], version: Optional[int]) -> bool:
+        """Whether `student` is an older copy than the one at `version` (rows without a version always apply)."""
+        return version is not None and student.get("version") is not None and student["version"] < version
+
+    def _insert(self, student: Dict[str, Any]) -> None:
+        student = dict(student)
+        version = student.pop("version", None)
+        if version is not None:
+            self._versions[student["id"]] = version
+        self._students[student["id"]] = student
+        bisect.insort(self._keys, self._key(student))
+
+    def _delete(self, student_id: int) -> Optional[Dict[str, Any]]:
+        student = self._students.pop(student_id, None)
+        if student is not None:
+            index = bisect.bisect_left(self._keys, self._key(student))
+            del self._keys[index]
+        return student
+
+    def _pend(self, student_id: int, student: Optional[Dict[str, Any]]) -> None:
+        """Remembers a write made while a load is in flight, to be applied on top of it."""
+        if not self._collecting:
+            return
+        pending = self._pending.get(student_id)
+        if student is None or pending is None or not self._is_older(student, pending.get("version")):
+            self._pending[student_id] = None if student is None else dict(student)
+
+    def _delta(self, rank_changed: Set[int], updated: Set[int], removed: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Builds the delta event for listeners (None if there are none or nothing
+        changed). Updated students are sent whole; students that only moved
+        are sent as id, points and rank.
+        """
+        if not self._listeners or not (rank_changed or updated or removed):
+            return None
+        students = []
+        for student_id in rank_changed | updated:
+            student = self._students.get(student_id)
+            if student is None:
+                continue
+            if student_id not in updated:
+                student = {"id": student_id, "points": student.get("points")}
+            students.append({**student, "rank": self._rank_by_id[student_id]})
+        students.sort(key=lambda student: (student["rank"], student["id"]))
+        return {"type": "delta", "students": students, "removed": removed}
+
+    def _changed(self, event: Optional[Dict[str, Any]]) -> None:
+        content_versions.bump(LEADERBOARD)
+        if event is not None:
+            for listener in self._listeners:
+                listener(event)
+
+    async def ensure_loaded(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> None:
+        """
+        Builds the cache from `fetch()` (all student rows) unless it is loaded.
+        Concurrent callers wait for the same fetch instead of each reading the table.
+        """
+        while not self._loaded:
+            loop = asyncio.get_running_loop()
+            loading = self._loading
+            if loading is None or loading.get_loop() is not loop:
+                with self._lock:
+                    generation = self._generation
+                    self._collecting = True
+                    self._pending = {}
+                loading = self._loading = loop.create_task(self._load(fetch, generation))
+            # A cancelled request must not cancel the load the other requests are waiting for.
+            await asyncio.shield(loading)
+
+    async def _load(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]], generation: int) -> None:
+        try:
+            self.load(await fetch(), generation)
+        finally:
+            with self._lock:
+                self._collecting = False
+                self._pending = {}
+            if self._loading is asyncio.current_task():
+                self._loading = None
+
+    def load(self, students: List[Dict[str, Any]], generation: Optional[int] = None) -> bool:
+        """
+        Replaces the cached leaderboard with the given student rows, read after
+        `generation` was current. Returns False (and changes nothing) if the
+        cache was invalidated since, as the rows may predate that change.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            rows = {student["id"]: student for student in students if student["id"] not in self._removed}
+            for student_id, student in self._pending.items():
+                if student is None:
+                    rows.pop(student_id, None)
+                elif student_id not in rows or not self._is_older(student, rows[student_id].get("version")):
+                    rows[student_id] = student
+            # Earlier deletions are reflected in the rows, so only those made during the load are kept.
+            self._removed = {student_id for student_id, student in self._pending.items() if student is None}
+            self._pending = {}
+            self._versions = {}
+            # The rows belong to the cache now, so `version` is moved out of them in place.
+            for student_id, student in rows.items():
+                version = student.pop("version", None)
+                if version is not None:
+                    self._versions[student_id] = version
+            self._students = rows
+            self._keys = sorted(self._key(student) for student in self._students.values())
+            self._rerank()
+            self._loaded = True
+            return True
+
+    def invalidate(self) -> None:
+        """Drops the cached leaderboard; it is rebuilt on the next read."""
+        with self._lock:
+            self._students = {}
+            self._keys = []
+            self._ranks = []
+            self._rank_by_id = {}
+            self._versions = {}
+            self._pending = {}
+            self._generation += 1
+            self._loaded = False
+        self._changed({"type": "reset"} if self._listeners else None)
+
+    def upsert(self, student: Dict[str, Any]) -> None:
+        """Inserts a student or replaces the cached copy of an existing one."""
+        self.upsert_many([student])
+
+    def upsert_many(self, students: List[Dict[str, Any]]) -> None:
+        """Like upsert, but re-ranks once for the whole batch. Older copies of cached students are ignored."""
+        event = None
+        with self._lock:
+            if self._loaded:
+                updated = set()
+                for student in students:
+                    if student["id"] in self._removed or self._is_older(student, self._versions.get(student["id"])):
+                        continue
+                    self._delete(student["id"])
+                    self._insert(student)
+                    updated.add(student["id"])
+                event = self._delta(self._rerank(), updated, [])
+            else:
+                for student in students:
+                    if student["id"] not in self._removed:
+                        self._pend(student["id"], student)
+        self._changed(event)
+
+    def remove(self, student_id: int) -> None:
+        event = None
+        with self._lock:
+            self._removed.add(student_id)
+            if self._loaded:
+                self._versions.pop(student_id, None)
+                if self._delete(student_id) is not None:
+                    event = self._delta(self._rerank(), set(), [student_id])
+            else:
+                self._pend(student_id, None)
+        self._changed(event)
+
+    def get(self, student_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the cached student, or None if it is not cached."""
+        with self._lock:
+            student = self._students.get(student_id)
+            return dict(student) if student is not None else None
+
+    def count(self, class_id: Optional[int] = None) -> int:
+        """Returns the number of cached students, optionally only those in one class."""
+        with self._lock:
+            if class_id is None:
+                return len(self._students)
+            return sum(1 for student in self._students.values() if student.get("class_id") == class_id)
+
+    def get_page(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after: Optional[Tuple[int, int]] = None,
+        class_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns ranked students, best first. `after` is a (points, id) keyset
+        cursor; `offset` is applied after it. Filtering by class keeps each
+        student's overall rank.
+        """
+        with self._lock:
+            start = 0 if after is None else bisect.bisect_right(self._keys, (-after[0], after[1]))
+            end = None if limit is None else offset + limit
+            positions = range(start, len(self._keys))
+            if class_id is None:
+                positions = positions[offset:end]
+            else:
+                positions = itertools.islice(
+                    (i for i in positions if self._students[self._keys[i][1]].get("class_id") == class_id),
+                    offset,
+                    end,
+                )
+            return [
+                {**self._students[self._keys[i][1]], "rank": self._ranks[i]}
+                for i in positions
+            ]
+
+leaderboard_cache = LeaderboardCache()
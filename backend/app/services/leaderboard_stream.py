@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.services.content_versions import content_versions, LEADERBOARD
+from app.services.leaderboard_cache import leaderboard_cache
+
+# Queued in place of events when a subscriber must start over from a snapshot.
+RESYNC = None
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """Encodes one Server-Sent Event."""
+    message = b""
+    if event_id is not None:
+        message += b"id: %d\n" % event_id
+    return message + b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class LeaderboardSubscription:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """
+        Waits for the next encoded event. Returns RESYNC when a fresh snapshot
+        is needed. Raises asyncio.TimeoutError if nothing arrives in time.
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LeaderboardBroadcaster:
+    """
+    Fans leaderboard changes out to every open stream in this worker.
+
+    Each change is encoded once and the same bytes are queued for every
+    subscriber, so a change costs one encode plus a queue append per open
+    connection. Queues are bounded: a client that falls
+    LEADERBOARD_STREAM_QUEUE_SIZE events behind has its backlog dropped and
+    receives a fresh snapshot instead, so slow clients never hold memory or
+    delay others.
+
+    Snapshots are shared the same way: after a reset every stream asks for
+    one at once, and they all get the bytes of a single snapshot event.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Set[LeaderboardSubscription] = set()
+        self._event_ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The last snapshot event and the build in flight, with the leaderboard version each started at.
+        self._snapshot: Optional[Tuple[int, bytes]] = None
+        self._building: Optional[Tuple[int, asyncio.Task]] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self) -> LeaderboardSubscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = LeaderboardSubscription(self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LeaderboardSubscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    async def snapshot_event(self, load: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> bytes:
+        """
+        Returns the encoded `snapshot` event of the ranked students from `load()`.
+        It is built once per leaderboard version; concurrent callers share the build.
+        """
+        version = content_versions.version(LEADERBOARD)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot[1]
+        loop = asyncio.get_running_loop()
+        # A build that started before the latest change could miss it, so it is only shared at the same version.
+        if self._building is None or self._building[0] != version or self._building[1].get_loop() is not loop:
+            self._building = (version, loop.create_task(self._build_snapshot(load, version)))
+        return await asyncio.shield(self._building[1])
+
+    async def _build_snapshot(self, load: Callable[[], Awaitable[List[Dict[str, Any]]]], version: int) -> bytes:
+        try:
+            event = format_event("snapshot", await load())
+            # Not kept if the leaderboard changed meanwhile: the event may mix both versions.
+            if content_versions.version(LEADERBOARD) == version:
+                self._snapshot = (version, event)
+            return event
+        finally:
+            if self._building is not None and self._building[1] is asyncio.current_task():
+                self._building = None
+
+    def publish_change(self, change: Dict[str, Any]) -> None:
+        """Leaderboard cache listener: queues the change for every subscriber."""
+        if not self._subscriptions:
+            return
+        if change["type"] == "reset":
+            message = RESYNC
+        else:
+            message = format_event("delta", {"students": change["students"], "removed": change["removed"]}, next(self._event_ids))
+
+        # Changes made from a worker thread are handed over to the event loop.
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._dispatch, message)
+            return
+        self._dispatch(message)
+
+    def _dispatch(self, message: Optional[bytes]) -> None:
+        for subscription in list(self._subscriptions):
+            if message is RESYNC:
+                self._resync(subscription)
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(subscription)
+
+    @staticmethod
+    def _resync(subscription: LeaderboardSubscription) -> None:
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(RESYNC)
+
+
+leaderboard_broadcaster = LeaderboardBroadcaster(queue_size=settings.LEADERBOARD_STREAM_QUEUE_SIZE)
+leaderboard_cache.add_listener(leaderboard_broadcaster.publish_change)
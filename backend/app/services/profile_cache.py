@@ -0,0 +1,42 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class ProfileCache:
+    """
+    Short-lived per-user cache of profiles read from the database, keyed by
+    (role, user id). Services invalidate an entry whenever they change that user.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Tuple[str, int], Tuple[Dict[str, Any], float]] = {}
+
+    def get(self, role: str, user_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((role, user_id))
+        if entry is None:
+            return None
+        profile, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop((role, user_id), None)
+            return None
+        return profile
+
+    def set(self, role: str, user_id: int, profile: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.maxsize:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[(role, user_id)] = (profile, time.monotonic() + self.ttl)
+
+    def invalidate(self, role: str, user_id: int) -> None:
+        self._entries.pop((role, user_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+profile_cache = ProfileCache(ttl=settings.PROFILE_CACHE_TTL)
@@ -1,81 +1,343 @@
-from supabase import Client
-from typing import List, Optional, Dict, Any
+import base64
+import binascii
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod
+from pydantic import ValidationError
+from typing import AsyncIterable, List, Optional, Dict, Any, Sequence, Tuple
 from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.points import PointsBulkAdd
+from app.services.leaderboard_cache import leaderboard_cache
+from app.services.cache_invalidation import students_changed, student_removed
+from app.db.postgres import get_postgres
+from app.db.supabase import returning
+
+# Columns that can be requested with `fields=`, and how each is selected.
+STUDENT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "points": "points",
+    "class_id": "class_id",
+    "class": "class:classes(id, name)",
+    "role": None, # Not a column: every student has the role 'student'.
+}
+# A full student row, with its class embedded. `version` orders copies of
+# the row in the leaderboard caches; it is not part of the API.
+STUDENT_SELECT = "id, name, points, class_id, class:classes(id, name), version"
+
+
+def encode_cursor(student: Dict[str, Any]) -> str:
+    """Returns an opaque cursor pointing just after `student` in (points desc, id) order."""
+    raw = f"{student.get('points') or 0}:{student['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Returns the (points, id) a cursor points after. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        points, student_id = raw.split(":")
+        return int(points), int(student_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def select_fields(student: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keeps only the requested fields of a student (all of them if `fields` is None)."""
+    if fields is None:
+        return student
+    return {field: student[field] for field in fields if field in student}
+
 
 class StudentService:
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: AsyncClient):
         self.db = db_client
         self.table = "students"
+        self.pg = get_postgres()
 
-    def create_student(self, student_in: UserCreate) -> Optional[Dict[str, Any]]:
+    async def create_student(self, student_in: UserCreate) -> Optional[Dict[str, Any]]:
         student_data = student_in.model_dump()
-        response = self.db.table(self.table).insert(student_data).execute()
+        # The insert returns the new row with its class, so no refetch is needed.
+        response = await returning(self.db.table(self.table).insert(student_data), STUDENT_SELECT).execute()
         if response.data:
             student = response.data[0]
-            # After creation, refetch the student to get the class object and role
-            created_student = self.get_student_by_id(student['id'])
-            return created_student
+            student['role'] = 'student'
+            students_changed([student])
+            return student
         return None
 
-    def get_all_students(self) -> List[Dict[str, Any]]:
+    async def import_students(self, rows: AsyncIterable[Dict[str, Optional[str]]], batch_size: int) -> Dict[str, Any]:
+        """
+        Creates students from CSV rows with `name`, `password` and either a
+        `class` name or a `class_id` column.
+
+        Rows are consumed one at a time, validated against UserCreate and
+        inserted in batches of `batch_size`. Class names are resolved with a
+        single lookup. Invalid rows are skipped and reported by row number
+        (the header is row 1).
+        """
+        classes_response = await self.db.table("classes").select("id, name").execute()
+        classes = classes_response.data or []
+        classes_by_name = {c['name']: c for c in classes}
+        classes_by_id = {c['id']: c for c in classes}
+
+        report = {"created": 0, "errors": []}
+        seen_passwords = set()
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        row_number = 1
+        async for row in rows:
+            row_number += 1
+            try:
+                student_data = self._parse_import_row(row, classes_by_name)
+            except ValueError as e:
+                report["errors"].append({"row": row_number, "error": self._import_error_message(e)})
+                continue
+
+            if student_data['password'] in seen_passwords:
+                report["errors"].append({"row": row_number, "error": "Password is repeated in the file."})
+                continue
+            seen_passwords.add(student_data['password'])
+
+            batch.append((row_number, student_data))
+            if len(batch) >= batch_size:
+                await self._insert_import_batch(batch, classes_by_id, report)
+                batch = []
+
+        if batch:
+            await self._insert_import_batch(batch, classes_by_id, report)
+        report["errors"].sort(key=lambda error: error["row"])
+        return report
+
+    @staticmethod
+    def _parse_import_row(row: Dict[str, Optional[str]], classes_by_name: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        name = (row.get("name") or "").strip()
+        password = (row.get("password") or "").strip()
+        class_name = (row.get("class") or "").strip()
+        class_id = (row.get("class_id") or "").strip() or None
+
+        if not name or not password:
+            raise ValueError("Both 'name' and 'password' are required.")
+        if class_name:
+            if class_name not in classes_by_name:
+                raise ValueError(f"Unknown class '{class_name}'.")
+            class_id = classes_by_name[class_name]['id']
+
+        return UserCreate(name=name, password=password, class_id=class_id).model_dump()
+
+    @staticmethod
+    def _import_error_message(error: ValueError) -> str:
+        if isinstance(error, ValidationError):
+            return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+        return str(error)
+
+    async def _insert_import_batch(self, batch: List[Tuple[int, Dict[str, Any]]], classes_by_id: Dict[int, Dict[str, Any]], report: Dict[str, Any]) -> None:
+        # Passwords are unique. Rows whose password is already taken are skipped by the
+        # insert itself (ON CONFLICT DO NOTHING) and reported, instead of failing the whole
+        # batch. Passwords only travel in the request body, never in a URL.
+        query = self.db.table(self.table).upsert(
+            [student_data for _, student_data in batch], on_conflict="password", ignore_duplicates=True
+        )
+        try:
+            response = await returning(query, "id, name, points, class_id, password, version").execute()
+        except APIError as e:
+            for row_number, _ in batch:
+                report["errors"].append({"row": row_number, "error": e.message or "Could not create student."})
+            return
+
+        created = response.data or []
+        report["created"] += len(created)
+        created_passwords = {student['password'] for student in created}
+        for row_number, student_data in batch:
+            if student_data['password'] not in created_passwords:
+                report["errors"].append({"row": row_number, "error": "Password already exists."})
+        students_changed([
+            {
+                "id": student['id'],
+                "name": student['name'],
+                "points": student.get('points') or 0,
+                "class_id": student.get('class_id'),
+                "class": classes_by_id.get(student.get('class_id')),
+                "role": "student",
+                "version": student.get('version'),
+            }
+            for student in created
+        ])
+
+    async def get_all_students(self) -> List[Dict[str, Any]]:
         """
         Retrieves all students from the database with their class name.
         """
-        response = self.db.table(self.table).select("id, name, points, class_id, class:classes(id, name)").order("points", desc=True).execute()
+        if self.pg is not None:
+            students = await self.pg.fetch_students_ranked()
+            for student in students:
+                student['role'] = 'student'
+            return students
+        response = await self.db.table(self.table).select(STUDENT_SELECT).order("points", desc=True).execute()
         students = response.data if response.data else []
         for student in students:
             student['role'] = 'student'
         return students
 
-    def get_student_by_id(self, student_id: int) -> Optional[Dict[str, Any]]:
+    async def list_students(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        class_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Retrieves one page of students ordered by (points desc, id).
+
+        Pages are keyset-paginated: `cursor` is the `next_cursor` of the
+        previous page, so every page costs the same regardless of its depth.
+        `total` (an estimate for large tables) is only computed for the first page.
+        Raises ValueError for a malformed cursor.
+        """
+        columns = {"id", "points", *(fields or STUDENT_FIELDS)}
+        select = ", ".join(STUDENT_FIELDS[column] for column in STUDENT_FIELDS if column in columns and STUDENT_FIELDS[column])
+        query = self.db.table(self.table).select(select, count=None if cursor else CountMethod.estimated)
+        if class_id is not None:
+            query = query.eq("class_id", class_id)
+        if cursor:
+            points, student_id = decode_cursor(cursor)
+            # The lte bound is redundant with the or(), but lets Postgres seek into the (points desc, id) index.
+            query = query.lte("points", points).or_(f"points.lt.{points},and(points.eq.{points},id.gt.{student_id})")
+        query = query.order("points", desc=True).order("id")
+        if limit is not None:
+            # One extra row tells whether there is a next page.
+            query = query.limit(limit + 1)
+        response = await query.execute()
+
+        students = response.data if response.data else []
+        next_cursor = None
+        if limit is not None and len(students) > limit:
+            students = students[:limit]
+            next_cursor = encode_cursor(students[-1])
+        for student in students:
+            student['role'] = 'student'
+        return {
+            "students": [select_fields(student, fields) for student in students],
+            "next_cursor": next_cursor,
+            "total": response.count,
+        }
+
+    async def get_leaderboard(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        class_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Retrieves one page of ranked students from the in-process leaderboard
+        cache; the database is only queried the first time the cache is built.
+        Pages work like list_students, and `offset` is applied after the cursor.
+        Raises ValueError for a malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        await leaderboard_cache.ensure_loaded(self.get_all_students)
+        students = leaderboard_cache.get_page(
+            limit=None if limit is None else limit + 1, offset=offset, after=after, class_id=class_id
+        )
+        next_cursor = None
+        if limit is not None and len(students) > limit:
+            students = students[:limit]
+            next_cursor = encode_cursor(students[-1])
+        return {
+            "students": [select_fields(student, fields) for student in students],
+            "next_cursor": next_cursor,
+            "total": None if cursor else leaderboard_cache.count(class_id=class_id),
+        }
+
+    async def get_student_by_id(self, student_id: int) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single student by their ID with their class name.
         """
-        response = self.db.table(self.table).select("id, name, points, class_id, class:classes(id, name)").eq("id", student_id).single().execute()
-        if response.data:
+        if self.pg is not None:
+            student = await self.pg.fetch_student(student_id)
+            if student:
+                student['role'] = 'student'
+            return student
+        response = await self.db.table(self.table).select(STUDENT_SELECT).eq("id", student_id).maybe_single().execute()
+        if response and response.data:
             student = response.data
             student['role'] = 'student'
             return student
         return None
 
-    def update_student(self, student_id: int, student_update: UserUpdate) -> Optional[Dict[str, Any]]:
+    async def update_student(self, student_id: int, student_update: UserUpdate) -> Optional[Dict[str, Any]]:
+        """
+        Updates a student and returns the updated row (with class) from the
+        update itself. Returns None if the student does not exist.
+        """
         update_data = student_update.model_dump(exclude_unset=True)
 
-        if not update_data:
-            return None
-
         # Don't update password if it's not provided or empty
         if 'password' in update_data and not update_data['password']:
             update_data.pop('password', None)
 
         if not update_data:
-            return self.get_student_by_id(student_id)
-
-        update_response = self.db.table(self.table).update(update_data).eq("id", student_id).execute()
-
-        if update_response.data:
-            return self.get_student_by_id(student_id)
+            return await self.get_student_by_id(student_id)
 
+        response = await returning(self.db.table(self.table).update(update_data).eq("id", student_id), STUDENT_SELECT).execute()
+        if response.data:
+            student = response.data[0]
+            student['role'] = 'student'
+            students_changed([student])
+            return student
         return None
 
-    def add_points(self, student_id: int, points_to_add: int) -> Optional[Dict[str, Any]]:
+    async def add_points(self, student_id: int, points_to_add: int) -> Optional[Dict[str, Any]]:
         """
         Adds points to a student's current score.
+
+        The increment runs server-side in the `add_student_points` database
+        function, so it is atomic and returns the updated student (with class)
+        in a single round trip. Returns None if the student does not exist.
         """
-        student = self.get_student_by_id(student_id)
-        if not student:
-            return None
+        if self.pg is not None:
+            student = await self.pg.add_student_points(student_id, points_to_add)
+        else:
+            response = await self.db.rpc("add_student_points", {"p_student_id": student_id, "p_points": points_to_add}).execute()
+            student = response.data
+        if student:
+            student['role'] = 'student'
+            students_changed([student])
+            return student
+        return None
 
-        current_points = student.get("points", 0)
-        new_points = current_points + points_to_add
+    async def add_points_bulk(self, points_in: PointsBulkAdd) -> List[Dict[str, Any]]:
+        """
+        Adds points to every student of a class, or to a list of students.
 
-        response = self.db.table(self.table).update({"points": new_points}).eq("id", student_id).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        All awards are applied by the `add_student_points_bulk` database
+        function in a single set-based UPDATE. Returns the updated students;
+        unknown student ids are skipped.
+        """
+        awards = None
+        if points_in.students is not None:
+            awards = [award.model_dump() for award in points_in.students]
+
+        if self.pg is not None:
+            students = await self.pg.add_student_points_bulk(awards, points_in.class_id, points_in.points)
+        else:
+            if awards is not None:
+                params = {"p_awards": awards}
+            else:
+                params = {"p_class_id": points_in.class_id, "p_points": points_in.points}
+            response = await self.db.rpc("add_student_points_bulk", params).execute()
+            students = response.data if response.data else []
+        for student in students:
+            student['role'] = 'student'
+        students_changed(students)
+        return students
 
-    def delete_student(self, student_id: int) -> Optional[Dict[str, Any]]:
-        response = self.db.table(self.table).delete().eq("id", student_id).execute()
+    async def delete_student(self, student_id: int) -> Optional[Dict[str, Any]]:
+        """Deletes a student. Returns the deleted row, or None if the student does not exist."""
+        response = await self.db.table(self.table).delete().eq("id", student_id).execute()
         if response.data:
+            student_removed(student_id)
             return response.data[0]
         return None
\ No newline at end of file
@@ -1,36 +1,47 @@
-from supabase import Client
+from supabase import AsyncClient
 from typing import Optional, Dict, Any
+from app.services.leaderboard_cache import leaderboard_cache
+from app.services.profile_cache import profile_cache
+from app.db.postgres import get_postgres
+
+ADMIN_PERMISSIONS = [
+    "can_manage_admins",
+    "can_manage_classes",
+    "can_manage_students",
+    "can_manage_weeks",
+    "can_manage_points",
+    "can_view_analytics",
+]
 
 class UserService:
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: AsyncClient):
         self.db = db_client
+        self.pg = get_postgres()
 
-    def authenticate_user(self, password: str) -> Optional[Dict[str, Any]]:
-        """
-        Authenticates a user by directly querying for the unique password.
+    async def authenticate_user(self, password: str) -> Optional[Dict[str, Any]]:
         """
-        # Check if the password belongs to an admin
-        admin_response = self.db.table("admins").select("*").eq("password", password).execute()
-        if admin_response.data:
-            admin = admin_response.data[0]
-            admin['role'] = 'admin'
-            return admin
-
-        # Check if the password belongs to a student
-        student_response = self.db.table("students").select("*, class:classes(id, name)").eq("password", password).execute()
-        if student_response.data:
-            student = student_response.data[0]
-            student['role'] = 'student'
-            return student
+        Authenticates a user by their unique password.
 
-        return None
+        The `authenticate_user` database function checks admins and students
+        in one statement and returns the user with its role, permissions or
+        class, so a login is a single round trip.
+        """
+        if self.pg is not None:
+            return await self.pg.authenticate_user(password)
+        response = await self.db.rpc("authenticate_user", {"p_password": password}).execute()
+        return response.data if response.data else None
 
-    def get_student(self, user_id: int) -> Optional[Dict[str, Any]]:
+    async def get_student(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a single student by ID, including their total points.
         """
-        student_response = self.db.table("students").select("*, class:classes(id, name)").eq("id", user_id).single().execute()
-        if not student_response.data:
+        if self.pg is not None:
+            student = await self.pg.fetch_student(user_id)
+            if student:
+                student['role'] = 'student'
+            return student
+        student_response = await self.db.table("students").select("*, class:classes(id, name)").eq("id", user_id).maybe_single().execute()
+        if not student_response or not student_response.data:
             return None
 
         student = student_response.data
@@ -38,13 +49,48 @@ class UserService:
 
         return student
 
-    def get_admin(self, user_id: int) -> Optional[Dict[str, Any]]:
+    async def get_admin(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a single admin by ID.
         """
-        response = self.db.table("admins").select("*").eq("id", user_id).single().execute()
-        if not response.data:
+        response = await self.db.table("admins").select("*").eq("id", user_id).maybe_single().execute()
+        if not response or not response.data:
             return None
         admin = response.data
         admin['role'] = 'admin'
-        return admin
\ No newline at end of file
+        return admin
+
+    async def get_admin_profile(self, claims: Any, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Returns the current admin. By default it is built from the token claims
+        without touching the database; `fresh` reads it from the database.
+        """
+        if not fresh and claims.name is not None:
+            profile = {"id": int(claims.id), "name": claims.name, "role": "admin"}
+            for permission in ADMIN_PERMISSIONS:
+                profile[permission] = bool(getattr(claims, permission, False))
+            return profile
+        return await self._get_profile("admin", int(claims.id), self.get_admin, fresh)
+
+    async def get_student_profile(self, student_id: int, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Returns a student with their current points. By default it is served
+        from the leaderboard cache or the short-lived profile cache; `fresh`
+        reads it from the database.
+        """
+        if not fresh:
+            student = leaderboard_cache.get(student_id)
+            if student:
+                return student
+        return await self._get_profile("student", student_id, self.get_student, fresh)
+
+    async def _get_profile(self, role: str, user_id: int, load, fresh: bool) -> Optional[Dict[str, Any]]:
+        if not fresh:
+            profile = profile_cache.get(role, user_id)
+            if profile:
+                return profile
+        profile = await load(user_id)
+        if profile:
+            profile.pop("password", None)
+            profile_cache.set(role, user_id, profile)
+        return profile
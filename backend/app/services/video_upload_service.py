@@ -0,0 +1,133 @@
+import base64
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from jose import jwt, JWTError
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from supabase import AsyncClient
+
+from app.core.config import settings
+
+TUS_VERSION = "1.0.0"
+
+# Upload ids are signed with a key derived from SECRET_KEY so they can never
+# be mistaken for (or used as) access tokens.
+UPLOAD_ID_KEY = f"{settings.SECRET_KEY}:video-upload"
+
+# Supabase keeps unfinished resumable uploads for 24 hours.
+UPLOAD_EXPIRE_HOURS = 24
+
+
+class VideoUploadService:
+    """
+    Uploads week videos through Supabase Storage's resumable (TUS) endpoint.
+
+    Files are sent in fixed-size chunks (VIDEO_UPLOAD_CHUNK_SIZE), so memory
+    use is bounded by one chunk regardless of the video size, and an
+    interrupted upload can continue from the last acknowledged offset.
+    Upload sessions are stateless: the upload id handed to clients is a
+    signed token carrying the upstream upload URL, the object path and size.
+    """
+
+    def __init__(self, db_client: AsyncClient, bucket_name: str):
+        self.db = db_client
+        self.session = db_client.storage.session
+        self.bucket_name = bucket_name
+        self.chunk_size = settings.VIDEO_UPLOAD_CHUNK_SIZE
+
+    @staticmethod
+    def build_video_path(week_id: int, filename: Optional[str]) -> str:
+        _, file_extension = os.path.splitext(filename or "")
+        return f"week_{week_id}/{uuid.uuid4()}{file_extension}"
+
+    async def create_upload(self, week_id: int, filename: Optional[str], content_type: Optional[str], size: int) -> Dict[str, Any]:
+        """
+        Starts a resumable upload and returns its session (upload id, offset, size).
+        """
+        path = self.build_video_path(week_id, filename)
+        metadata = {
+            "bucketName": self.bucket_name,
+            "objectName": path,
+            "contentType": content_type or "application/octet-stream",
+        }
+        response = await self.session.post(
+            "upload/resumable",
+            headers={
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Length": str(size),
+                "Upload-Metadata": ",".join(
+                    f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items()
+                ),
+                "x-upsert": "true",
+            },
+        )
+        response.raise_for_status()
+
+        upload = {
+            "week_id": week_id,
+            "path": path,
+            "size": size,
+            "location": response.headers["Location"],
+            "exp": datetime.utcnow() + timedelta(hours=UPLOAD_EXPIRE_HOURS),
+        }
+        upload_id = jwt.encode(upload, UPLOAD_ID_KEY, algorithm=settings.ALGORITHM)
+        return {"upload_id": upload_id, "path": path, "offset": 0, "size": size, "chunk_size": self.chunk_size}
+
+    @staticmethod
+    def decode_upload_id(upload_id: str, week_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Returns the upload described by `upload_id`, or None if it is invalid,
+        expired, or belongs to another week.
+        """
+        try:
+            upload = jwt.decode(upload_id, UPLOAD_ID_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        if upload.get("week_id") != week_id:
+            return None
+        return upload
+
+    async def get_offset(self, upload: Dict[str, Any]) -> int:
+        """Returns how many bytes of the upload the storage server has received."""
+        response = await self.session.head(upload["location"], headers={"Tus-Resumable": TUS_VERSION})
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    async def write_chunk(self, upload: Dict[str, Any], offset: int, chunk: bytes) -> int:
+        """Sends one chunk starting at `offset` and returns the new offset."""
+        response = await self.session.patch(
+            upload["location"],
+            content=chunk,
+            headers={
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            },
+        )
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    async def upload_file(self, week_id: int, file: UploadFile) -> str:
+        """
+        Uploads a whole file chunk by chunk and returns its storage path.
+        """
+        size = file.size
+        if size is None:
+            size = await run_in_threadpool(file.file.seek, 0, os.SEEK_END)
+
+        session = await self.create_upload(week_id, file.filename, file.content_type, size)
+        upload = self.decode_upload_id(session["upload_id"], week_id)
+        offset = 0
+        while offset < size:
+            await file.seek(offset)
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                break
+            offset = await self.write_chunk(upload, offset, chunk)
+        return session["path"]
+
+    async def get_public_url(self, path: str) -> str:
+        return await self.db.storage.from_(self.bucket_name).get_public_url(path)
@@ -1,83 +1,103 @@
-import os
-from supabase import Client
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
 from typing import List, Optional, Dict, Any
 from app.schemas.week import WeekCreate, WeekUpdate, ContentCardCreate, ContentCardUpdate
+from app.services.video_upload_service import VideoUploadService
+from app.services.cache_invalidation import weeks_changed
+from app.db.postgres import get_postgres
+from app.db.supabase import returning
 from fastapi import UploadFile
-import uuid
-import os
-import re
+
+# A full week, with its content cards embedded.
+WEEK_SELECT = "*, content_cards(*)"
+# Postgres error raised when a card references a week that does not exist.
+FOREIGN_KEY_VIOLATION = "23503"
 
 class WeekService:
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: AsyncClient):
         self.db = db_client
         self.weeks_table = "weeks"
         self.cards_table = "content_cards"
+        self.pg = get_postgres()
+
+    def _returning_week(self, query):
+        # Writes return the full week (cards in order), like get_week_by_id.
+        return returning(query, WEEK_SELECT, embedded_order={self.cards_table: "id"})
 
     # Week Management
-    def create_week(self, week_in: WeekCreate) -> Optional[Dict[str, Any]]:
-        response = self.db.table(self.weeks_table).insert(week_in.model_dump()).execute()
+    async def create_week(self, week_in: WeekCreate) -> Optional[Dict[str, Any]]:
+        response = await self._returning_week(self.db.table(self.weeks_table).insert(week_in.model_dump())).execute()
+        weeks_changed()
         return response.data[0] if response.data else None
 
-    def get_all_weeks_with_content(self) -> List[Dict[str, Any]]:
-        weeks_response = self.db.table(self.weeks_table).select("*").order("id").execute()
-        if not weeks_response.data:
-            return []
-
-        weeks = weeks_response.data
-        for week in weeks:
-            cards_response = self.db.table(self.cards_table).select("*").eq("week_id", week["id"]).execute()
-            week["content_cards"] = cards_response.data if cards_response.data else []
-
-        return weeks
-
-    def get_week_by_id(self, week_id: int) -> Optional[Dict[str, Any]]:
-        response = self.db.table(self.weeks_table).select("*").eq("id", week_id).single().execute()
-        if not response.data:
-            return None
-
-        week = response.data
-        cards_response = self.db.table(self.cards_table).select("*").eq("week_id", week["id"]).execute()
-        week["content_cards"] = cards_response.data if cards_response.data else []
-
-        return week
-
-    def update_week(self, week_id: int, week_in: WeekUpdate) -> Optional[Dict[str, Any]]:
+    async def get_all_weeks_with_content(self) -> List[Dict[str, Any]]:
+        if self.pg is not None:
+            return await self.pg.fetch_weeks_with_content()
+        # Cards are embedded in the weeks query so the whole catalogue is a single round trip.
+        response = await self.db.table(self.weeks_table).select(WEEK_SELECT).order("id").order("id", foreign_table=self.cards_table).execute()
+        return response.data if response.data else []
+
+    async def get_week_by_id(self, week_id: int) -> Optional[Dict[str, Any]]:
+        if self.pg is not None:
+            return await self.pg.fetch_week(week_id)
+        response = await self.db.table(self.weeks_table).select(WEEK_SELECT).eq("id", week_id).order("id", foreign_table=self.cards_table).maybe_single().execute()
+        return response.data if response else None
+
+    async def update_week(self, week_id: int, week_in: WeekUpdate) -> Optional[Dict[str, Any]]:
+        """Returns the updated week with its cards, or None if it does not exist."""
         update_data = week_in.model_dump(exclude_unset=True)
         if not update_data:
-            return self.get_week_by_id(week_id)
-        response = self.db.table(self.weeks_table).update(update_data).eq("id", week_id).execute()
-        return response.data[0] if response.data else None
+            return await self.get_week_by_id(week_id)
+        response = await self._returning_week(self.db.table(self.weeks_table).update(update_data).eq("id", week_id)).execute()
+        if not response.data:
+            return None
+        weeks_changed()
+        return response.data[0]
 
-    def delete_week(self, week_id: int) -> Optional[Dict[str, Any]]:
+    async def delete_week(self, week_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the deleted week with its cards, or None if it does not exist."""
         # The database is set to cascade deletes, so cards will be deleted automatically.
-        response = self.db.table(self.weeks_table).delete().eq("id", week_id).execute()
-        return response.data[0] if response.data else None
-
-    def upload_video(self, week_id: int, file: UploadFile, bucket_name: str) -> Optional[Dict[str, Any]]:
-        _, file_extension = os.path.splitext(file.filename)
-        file_path = f"week_{week_id}/{uuid.uuid4()}{file_extension}"
-
-        # Upload to Supabase Storage
-        self.db.storage.from_(bucket_name).upload(file_path, file.file.read(), {"contentType": file.content_type})
+        response = await self._returning_week(self.db.table(self.weeks_table).delete().eq("id", week_id)).execute()
+        if not response.data:
+            return None
+        weeks_changed()
+        return response.data[0]
 
-        # Get public URL
-        public_url = self.db.storage.from_(bucket_name).get_public_url(file_path)
+    async def upload_video(self, week_id: int, file: UploadFile, bucket_name: str) -> Optional[Dict[str, Any]]:
+        # Stream the file to Supabase Storage in fixed-size chunks instead of reading it into memory
+        uploader = VideoUploadService(self.db, bucket_name)
+        file_path = await uploader.upload_file(week_id, file)
+        return await self.set_video(week_id, await uploader.get_public_url(file_path))
 
-        # Update the week's video_url
-        return self.update_week(week_id, WeekUpdate(video_url=public_url))
+    async def set_video(self, week_id: int, public_url: str) -> Optional[Dict[str, Any]]:
+        """Points the week at an uploaded video."""
+        return await self.update_week(week_id, WeekUpdate(video_url=public_url))
 
     # Content Card Management
-    def add_card_to_week(self, week_id: int, card_in: ContentCardCreate) -> Optional[Dict[str, Any]]:
+    async def add_card_to_week(self, week_id: int, card_in: ContentCardCreate) -> Optional[Dict[str, Any]]:
+        """Returns the new card, or None if the week does not exist."""
         card_data = card_in.model_dump()
         card_data["week_id"] = week_id
-        response = self.db.table(self.cards_table).insert(card_data).execute()
+        try:
+            response = await self.db.table(self.cards_table).insert(card_data).execute()
+        except APIError as e:
+            if e.code == FOREIGN_KEY_VIOLATION:
+                return None
+            raise
+        weeks_changed()
         return response.data[0] if response.data else None
 
-    def update_card(self, card_id: int, card_in: ContentCardUpdate) -> Optional[Dict[str, Any]]:
+    async def update_card(self, card_id: int, card_in: ContentCardUpdate) -> Optional[Dict[str, Any]]:
         update_data = card_in.model_dump(exclude_unset=True)
-        response = self.db.table(self.cards_table).update(update_data).eq("id", card_id).execute()
-        return response.data[0] if response.data else None
+        response = await self.db.table(self.cards_table).update(update_data).eq("id", card_id).execute()
+        if not response.data:
+            return None
+        weeks_changed()
+        return response.data[0]
 
-    def delete_card(self, card_id: int) -> Optional[Dict[str, Any]]:
-        response = self.db.table(self.cards_table).delete().eq("id", card_id).execute()
-        return response.data[0] if response.data else None
\ No newline at end of file
+    async def delete_card(self, card_id: int) -> Optional[Dict[str, Any]]:
+        response = await self.db.table(self.cards_table).delete().eq("id", card_id).execute()
+        if not response.data:
+            return None
+        weeks_changed()
+        return response.data[0]
\ No newline at end of file
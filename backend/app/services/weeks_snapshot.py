@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import importlib.util
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.schemas.week import Week
+from app.services.content_versions import content_versions, WEEKS
+
+# The snapshot is compressed once per change and then served many times, so
+# it uses the highest levels rather than the middleware's per-response ones.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+_weeks_adapter = TypeAdapter(List[Week])
+
+
+class EncodedBody:
+    """A JSON response body with its ETag and compressed variants, by Content-Encoding."""
+
+    def __init__(self, version: int, body: bytes, etag: str, encodings: Dict[str, bytes]):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.encodings = encodings
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Each content-coding is a different representation, so it gets its own strong ETag."""
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+def encode_body(version: int, body: bytes) -> EncodedBody:
+    encodings = {}
+    # Bodies below the middleware's threshold are sent uncompressed, as before.
+    if len(body) >= settings.COMPRESSION_MINIMUM_SIZE:
+        if importlib.util.find_spec("brotli") is not None:
+            import brotli
+
+            encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        encodings["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return EncodedBody(version, body, content_versions.make_etag(body), encodings)
+
+
+class WeeksSnapshot:
+    """
+    The public weeks catalogue (`List[Week]`), kept as encoded JSON.
+
+    The snapshot is built from the database on the first read after the
+    weeks content version changes (every week, card or video write bumps it,
+    in all workers through the invalidation bus). Until then reads are served
+    from memory, with no query and no Pydantic validation. Concurrent reads
+    after a change share a single build.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[EncodedBody] = None
+        # The build in flight, with the weeks version it started at.
+        self._building: Optional[Tuple[int, asyncio.Task]] = None
+
+    def current(self) -> Optional[EncodedBody]:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == content_versions.version(WEEKS):
+            return snapshot
+        return None
+
+    async def get(self, load: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> EncodedBody:
+        """Returns the current snapshot, building it with `load()` if the weeks changed."""
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+
+        version = content_versions.version(WEEKS)
+        loop = asyncio.get_running_loop()
+        # A build that started before the latest change could miss it, so it is only shared at the same version.
+        if self._building is None or self._building[0] != version or self._building[1].get_loop() is not loop:
+            self._building = (version, loop.create_task(self._build(load, version)))
+        # A cancelled request must not cancel the build the other requests are waiting for.
+        return await asyncio.shield(self._building[1])
+
+    async def _build(self, load: Callable[[], Awaitable[List[Dict[str, Any]]]], version: int) -> EncodedBody:
+        try:
+            weeks = await load()
+            # Validation and compression are CPU-bound, so they run off the event loop.
+            snapshot = await run_in_threadpool(self._encode, version, weeks)
+            with self._lock:
+                # A snapshot from before a concurrent write must not replace a newer one.
+                if self._snapshot is None or self._snapshot.version <= version:
+                    self._snapshot = snapshot
+            return snapshot
+        finally:
+            if self._building is not None and self._building[1] is asyncio.current_task():
+                self._building = None
+
+    @staticmethod
+    def _encode(version: int, weeks: List[Dict[str, Any]]) -> EncodedBody:
+        body = _weeks_adapter.dump_json(_weeks_adapter.validate_python(weeks), by_alias=True)
+        return encode_body(version, body)
+
+
+weeks_snapshot = WeeksSnapshot()
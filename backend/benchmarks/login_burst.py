@@ -0,0 +1,67 @@
+"""
+Classroom login burst benchmark.
+
+Fires a burst of concurrent logins at a running API and reports the latency
+distribution, the way a whole class logging in at once does.
+
+Run from the backend directory:
+
+    python -m benchmarks.login_burst --url http://localhost:8001 --password student123 --concurrency 500
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+import httpx
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def login(client: httpx.AsyncClient, start: asyncio.Event, password: str) -> Tuple[float, bool]:
+    await start.wait()
+    started = time.perf_counter()
+    try:
+        response = await client.post("/api/v1/login/token", data={"username": "", "password": password})
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+async def run(url: str, password: str, concurrency: int) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        start = asyncio.Event()
+        tasks = [asyncio.create_task(login(client, start, password)) for _ in range(concurrency)]
+        await asyncio.sleep(0) # let every task reach the start line
+        burst_started = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - burst_started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"logins: {concurrency}  errors: {errors}  wall time: {elapsed:.2f}s  throughput: {concurrency / elapsed:.1f} req/s")
+    print(
+        f"latency ms  p50: {percentile(latencies, 50):.1f}  p95: {percentile(latencies, 95):.1f}  "
+        f"p99: {percentile(latencies, 99):.1f}  max: {latencies[-1]:.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001", help="Base URL of the running API")
+    parser.add_argument("--password", required=True, help="Password of an existing student or admin")
+    parser.add_argument("--concurrency", type=int, default=500, help="Number of simultaneous logins")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.password, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Response serialization benchmark.
+
+Builds synthetic `List[Week]` and `List[User]` payloads (10x our current data
+size by default, with Arabic card descriptions) and compares how long each
+serializer takes and how many bytes go on the wire with each encoding.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization --scale 10 --repeat 50
+"""
+import argparse
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas.user import User
+from app.schemas.week import Week
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Rough size of the live data set the scale factor is applied to.
+BASE_WEEKS = 30
+BASE_CARDS_PER_WEEK = 5
+BASE_STUDENTS = 300
+BASE_CLASSES = 10
+
+ARABIC_DESCRIPTION = "استمع دائمًا إلى الآخرين وقدّر آراءهم، فالاحترام أساس الحوار الناجح بين الطلاب والمعلمين."
+
+
+def build_weeks(scale: int) -> List[Dict[str, Any]]:
+    weeks = []
+    card_id = 1
+    for week_id in range(1, BASE_WEEKS * scale + 1):
+        cards = []
+        for _ in range(BASE_CARDS_PER_WEEK):
+            cards.append({"id": card_id, "week_id": week_id, "title": f"بطاقة {card_id}", "description": ARABIC_DESCRIPTION})
+            card_id += 1
+        weeks.append({
+            "id": week_id,
+            "week_number": week_id,
+            "title": f"الأسبوع {week_id}: قيمة الاحترام",
+            "is_locked": week_id % 4 == 0,
+            "video_url": f"https://example.supabase.co/storage/v1/object/public/videos/week_{week_id}/video.mp4",
+            "content_cards": cards,
+        })
+    return weeks
+
+
+def build_students(scale: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": student_id,
+            "name": f"طالب رقم {student_id}",
+            "points": (student_id * 37) % 500,
+            "class_id": student_id % BASE_CLASSES + 1,
+            "role": "student",
+            "class": {"id": student_id % BASE_CLASSES + 1, "name": f"الفصل {student_id % BASE_CLASSES + 1}"},
+        }
+        for student_id in range(1, BASE_STUDENTS * scale + 1)
+    ]
+
+
+def serializers(response_type: Any) -> Dict[str, Callable[[Any], bytes]]:
+    """The serialization paths a response can take, keyed by name."""
+    adapter = TypeAdapter(response_type)
+
+    def to_content(data):
+        # What FastAPI does with a response_model before handing it to the response class.
+        return adapter.dump_python(adapter.validate_python(data), mode="json", by_alias=True)
+
+    def stdlib_json(data):
+        # JSONResponse
+        return json.dumps(to_content(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def orjson_response(data):
+        # ORJSONResponse (the app default)
+        return orjson.dumps(to_content(data))
+
+    def pydantic_dump_json(data):
+        # What conditional (ETag) responses do.
+        return adapter.dump_json(adapter.validate_python(data), by_alias=True)
+
+    return {"json": stdlib_json, "orjson": orjson_response, "pydantic": pydantic_dump_json}
+
+
+def time_per_call(func: Callable[[], Any], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(name: str, response_type: Any, data: List[Dict[str, Any]], repeat: int) -> None:
+    print(f"\n{name}: {len(data)} items")
+    print(f"{'serializer':<12}{'ms/call':>10}")
+    body = b""
+    for serializer_name, serialize in serializers(response_type).items():
+        body = serialize(data)
+        print(f"{serializer_name:<12}{time_per_call(lambda: serialize(data), repeat) * 1000:>10.2f}")
+
+    print(f"{'encoding':<12}{'bytes':>12}{'ms/call':>10}")
+    encodings = {"identity": lambda: body, "gzip": lambda: gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        encodings["br"] = lambda: brotli.compress(body, quality=4)
+    for encoding, encode in encodings.items():
+        print(f"{encoding:<12}{len(encode()):>12}{time_per_call(encode, repeat) * 1000:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10, help="multiple of the current data size")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    report("List[Week]", List[Week], build_weeks(args.scale), args.repeat)
+    report("List[User]", List[User], build_students(args.scale), args.repeat)
+    if brotli is None:
+        print("\n(brotli is not installed; br sizes skipped)")
+
+
+if __name__ == "__main__":
+    main()
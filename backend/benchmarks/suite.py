@@ -0,0 +1,266 @@
+"""
+Endpoint benchmark suite.
+
+Starts the Supabase stand-in (benchmarks/supabase_standin.py) and the real
+app (`app.main:app` under uvicorn) pointed at it, then runs scripted
+scenarios and reports p50/p95/p99 latency and requests/sec for each:
+
+- login_burst: a whole class logging in at the same moment
+- leaderboard_polling: clients polling the leaderboard with their ETag
+- weeks_page: students loading the weeks page (weeks + their profile)
+- bulk_points: admins awarding points to whole classes
+
+Run from the backend directory:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json   # exits 1 on a regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+from jose import jwt
+
+from benchmarks.login_burst import percentile
+from benchmarks.supabase_standin import ADMIN_PASSWORD, add_seed_arguments, student_password
+
+Result = Tuple[float, bool]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not start in {timeout:.0f}s")
+                await asyncio.sleep(0.2)
+
+
+async def timed(request: Awaitable[httpx.Response], ok_statuses=(200, 304)) -> Tuple[Result, httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await request
+        ok = response.status_code in ok_statuses
+    except httpx.HTTPError:
+        response, ok = None, False
+    return (time.perf_counter() - started, ok), response
+
+
+async def run_load(total: int, concurrency: int, make_request: Callable[[int], Awaitable[Result]]) -> Tuple[List[Result], float]:
+    """Runs `total` requests with `concurrency` requests in flight at a time."""
+    counter = iter(range(total))
+    results: List[Result] = []
+
+    async def worker():
+        for index in counter:
+            results.append(await make_request(index))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+async def run_burst(total: int, make_request: Callable[[int], Awaitable[Result]]) -> Tuple[List[Result], float]:
+    """Starts all `total` requests at the same moment."""
+    start = asyncio.Event()
+
+    async def one(index: int) -> Result:
+        await start.wait()
+        return await make_request(index)
+
+    tasks = [asyncio.create_task(one(index)) for index in range(total)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    start.set()
+    results = await asyncio.gather(*tasks)
+    return list(results), time.perf_counter() - started
+
+
+def summarize(results: List[Result], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
+
+
+# --- Scenarios ---
+
+async def login(client: httpx.AsyncClient, password: str) -> str:
+    response = await client.post("/api/v1/login/token", data={"username": "", "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def login_burst(client: httpx.AsyncClient, args) -> Tuple[List[Result], float]:
+    async def request(index: int) -> Result:
+        password = student_password(index % args.students + 1)
+        result, _ = await timed(client.post("/api/v1/login/token", data={"username": "", "password": password}), (200,))
+        return result
+
+    return await run_burst(args.burst, request)
+
+
+async def leaderboard_polling(client: httpx.AsyncClient, args) -> Tuple[List[Result], float]:
+    etags: Dict[int, str] = {}
+
+    async def request(index: int) -> Result:
+        poller = index % args.concurrency
+        headers = {"If-None-Match": etags[poller]} if poller in etags else {}
+        result, response = await timed(client.get("/api/v1/leaderboard/", params={"limit": 50}, headers=headers))
+        if response is not None and "etag" in response.headers:
+            etags[poller] = response.headers["etag"]
+        return result
+
+    return await run_load(args.requests, args.concurrency, request)
+
+
+async def weeks_page(client: httpx.AsyncClient, args) -> Tuple[List[Result], float]:
+    tokens = [await login(client, student_password(i % args.students + 1)) for i in range(min(args.concurrency, args.students))]
+
+    async def request(index: int) -> Result:
+        headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+        if index % 2:
+            result, _ = await timed(client.get("/api/v1/dashboard/me", headers=headers), (200,))
+        else:
+            result, _ = await timed(client.get("/api/v1/weeks/", headers=headers), (200,))
+        return result
+
+    return await run_load(args.requests, args.concurrency, request)
+
+
+async def bulk_points(client: httpx.AsyncClient, args) -> Tuple[List[Result], float]:
+    headers = {"Authorization": f"Bearer {await login(client, ADMIN_PASSWORD)}"}
+
+    async def request(index: int) -> Result:
+        body = {"class_id": index % args.classes + 1, "points": 1}
+        result, _ = await timed(client.post("/api/v1/admin/students/add-points", json=body, headers=headers), (200,))
+        return result
+
+    return await run_load(max(args.requests // 10, 1), max(args.concurrency // 10, 1), request)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, Any], Awaitable[Tuple[List[Result], float]]]] = {
+    "login_burst": login_burst,
+    "leaderboard_polling": leaderboard_polling,
+    "weeks_page": weeks_page,
+    "bulk_points": bulk_points,
+}
+
+
+# --- Running ---
+
+def start_servers(args) -> Tuple[List[subprocess.Popen], str, str]:
+    standin_url = f"http://127.0.0.1:{free_port()}"
+    app_url = f"http://127.0.0.1:{free_port()}"
+    seed = [
+        "--classes", str(args.classes), "--students", str(args.students),
+        "--weeks", str(args.weeks), "--cards-per-week", str(args.cards_per_week),
+    ]
+    standin = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.supabase_standin", "--port", standin_url.rsplit(":", 1)[1], *seed]
+    )
+    env = {
+        **os.environ,
+        "SUPABASE_URL": standin_url,
+        # The Supabase client only accepts JWT-shaped keys; the stand-in ignores it.
+        "SUPABASE_KEY": jwt.encode({"role": "anon"}, "standin", algorithm="HS256"),
+        "SECRET_KEY": "benchmark-secret",
+        "SUPABASE_HTTP2": "false",
+    }
+    if args.workers > 1:
+        env["INVALIDATION_TRANSPORT"] = "unix"
+        env["INVALIDATION_SOCKET_PATH"] = f"/tmp/ghars-benchmark-{os.getpid()}.sock"
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", app_url.rsplit(":", 1)[1],
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    return [app, standin], standin_url, app_url
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline_path: str, tolerance: float) -> bool:
+    """Prints the change against a baseline and returns False if anything regressed."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    passed = True
+    print(f"\ncompared with {baseline_path} (tolerance {tolerance:.0%})")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        p95_change = result["p95"] / before["p95"] - 1 if before["p95"] else 0.0
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance or result["errors"] > before["errors"]
+        passed = passed and not regressed
+        print(f"{name:<22}p95 {p95_change:+.0%}  rps {rps_change:+.0%}  {'REGRESSION' if regressed else 'ok'}")
+    return passed
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    processes, standin_url, app_url = start_servers(args)
+    try:
+        await wait_until_up(f"{standin_url}/rest/v1/classes?limit=1")
+        await wait_until_up(app_url)
+        limits = httpx.Limits(max_connections=max(args.concurrency, args.burst), max_keepalive_connections=args.concurrency)
+        results = {}
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60) as client:
+            for name in args.scenarios:
+                summary = summarize(*await SCENARIOS[name](client, args))
+                results[name] = summary
+                print(
+                    f"{name:<22}{summary['requests']:>6} req  {summary['errors']:>4} err  {summary['rps']:>8.1f} req/s  "
+                    f"p50 {summary['p50']:>7.1f}  p95 {summary['p95']:>7.1f}  p99 {summary['p99']:>7.1f}  max {summary['max']:>7.1f} ms"
+                )
+        return results
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--burst", type=int, default=300, help="simultaneous logins in login_burst")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput change before failing")
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
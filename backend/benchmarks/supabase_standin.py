@@ -0,0 +1,431 @@
+"""
+Offline stand-in for a Supabase project, for benchmarks.
+
+Serves the subset of the PostgREST and Storage HTTP APIs that the services
+use, backed by in-memory tables seeded with synthetic data:
+
+- table reads with column lists, aliases and embedded relations
+  (`class:classes(id, name)`, `content_cards(*)`), eq/in/lt/gt/or filters,
+  ordering (including embedded ordering), limit/offset and counts
+- single-object responses, inserts (with on_conflict ignore-duplicates),
+  updates and deletes
+- the database functions in migrations/ (authenticate_user,
+  add_student_points, add_student_points_bulk)
+- resumable (TUS) uploads to Storage
+
+The real app talks to it over HTTP exactly as it would to Supabase, so the
+whole request path (Supabase client, HTTP pool, services, serialization) is
+measured. Only the database time is missing.
+
+Run it on its own with:
+
+    python -m benchmarks.supabase_standin --port 54321 --students 3000
+"""
+import argparse
+import itertools
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+ADMIN_PASSWORD = "admin-password"
+
+
+def student_password(student_id: int) -> str:
+    return f"student-{student_id}"
+
+
+# (table, embedded table) -> (local column, remote column, embeds a single row)
+RELATIONS = {
+    ("students", "classes"): ("class_id", "id", True),
+    ("weeks", "content_cards"): ("id", "week_id", False),
+}
+DEFAULTS = {
+    "students": {"points": 0, "role": "student", "class_id": None, "version": 1},
+    "admins": {
+        "role": "admin", "can_manage_admins": True, "can_manage_classes": True, "can_manage_students": True,
+        "can_manage_weeks": True, "can_manage_points": True, "can_view_analytics": False,
+    },
+    "weeks": {"video_url": None, "is_locked": True},
+    "content_cards": {"description": None},
+    "classes": {},
+}
+UNIQUE = {"students": "password", "admins": "password", "classes": "name"}
+
+
+def bump_version(row: Dict[str, Any]) -> None:
+    """Like the students_bump_version trigger (migrations/0008)."""
+    if "version" in row:
+        row["version"] += 1
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+class Store:
+    """In-memory tables with auto-increment ids."""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[int, Dict[str, Any]]] = {name: {} for name in DEFAULTS}
+        self._ids = {name: itertools.count(1) for name in DEFAULTS}
+
+    def insert(self, table: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        unique = UNIQUE.get(table)
+        if unique and any(row[unique] == values.get(unique) for row in self.tables[table].values()):
+            raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{table}_{unique}_key"')
+        if table == "content_cards" and values.get("week_id") not in self.tables["weeks"]:
+            raise PostgrestError(409, "23503", 'insert or update on table "content_cards" violates foreign key constraint "content_cards_week_id_fkey"')
+        row = {**DEFAULTS[table], **values, "id": values.get("id") or next(self._ids[table])}
+        row["created_at"] = datetime.now(timezone.utc).isoformat()
+        self.tables[table][row["id"]] = row
+        return row
+
+    def delete(self, table: str, row_id: int) -> Dict[str, Any]:
+        row = self.tables[table].pop(row_id)
+        if table == "weeks":
+            for card in [card for card in self.tables["content_cards"].values() if card["week_id"] == row_id]:
+                del self.tables["content_cards"][card["id"]]
+        if table == "classes":
+            for student in self.tables["students"].values():
+                if student["class_id"] == row_id:
+                    student["class_id"] = None
+                    bump_version(student)
+        return row
+
+    def seed(self, classes: int, students: int, weeks: int, cards_per_week: int) -> None:
+        self.insert("admins", {"name": "Benchmark Admin", "password": ADMIN_PASSWORD, "can_view_analytics": True})
+        for class_id in range(1, classes + 1):
+            self.insert("classes", {"name": f"الفصل {class_id}"})
+        for student_id in range(1, students + 1):
+            self.insert("students", {
+                "name": f"طالب رقم {student_id}",
+                "password": student_password(student_id),
+                "class_id": student_id % classes + 1 if classes else None,
+                "points": (student_id * 37) % 500,
+            })
+        for week_id in range(1, weeks + 1):
+            self.insert("weeks", {"week_number": week_id, "title": f"الأسبوع {week_id}", "is_locked": False})
+            for card in range(cards_per_week):
+                self.insert("content_cards", {
+                    "week_id": week_id,
+                    "title": f"بطاقة {card + 1}",
+                    "description": "استمع دائمًا إلى الآخرين وقدّر آراءهم، فالاحترام أساس الحوار الناجح.",
+                })
+
+
+# --- Query parsing ---
+
+def split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Splits on `separator` outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == separator and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_select(select: str) -> List[Tuple[str, str, Optional[List]]]:
+    """Parses a select list into (output name, column or table, nested select) entries."""
+    columns = []
+    for item in split_top_level(select):
+        match = re.fullmatch(r"(?:(\w+):)?(\w+|\*)(?:\((.*)\))?", item, re.S)
+        if not match:
+            raise PostgrestError(400, "PGRST100", f"Unsupported select item '{item}'")
+        alias, name, nested = match.groups()
+        columns.append((alias or name, name, parse_select(nested) if nested is not None else None))
+    return columns
+
+
+def coerce(value: str, example: Any) -> Any:
+    value = value.strip('"')
+    if value == "null":
+        return None
+    if isinstance(example, bool):
+        return value == "true"
+    if isinstance(example, int):
+        return int(value)
+    return value
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def parse_condition(column: str, expression: str) -> Callable[[Dict[str, Any]], bool]:
+    operator, _, value = expression.partition(".")
+    if operator == "in":
+        values = [item.strip('"') for item in split_top_level(value.strip("()"))]
+        return lambda row: row.get(column) is not None and str(row.get(column)) in values
+    if operator == "is":
+        return lambda row: row.get(column) is None if value == "null" else row.get(column) == (value == "true")
+    if operator not in OPERATORS:
+        raise PostgrestError(400, "PGRST100", f"Unsupported operator '{operator}'")
+    compare = OPERATORS[operator]
+    return lambda row: compare(row.get(column), coerce(value, row.get(column)))
+
+
+def parse_logic(expression: str, combine: Callable) -> Callable[[Dict[str, Any]], bool]:
+    """Parses the inside of or=(...) / and(...) into a row predicate."""
+    conditions = []
+    for term in split_top_level(expression.strip()[1:-1]):
+        if term.startswith("and("):
+            conditions.append(parse_logic(term[3:], all))
+        elif term.startswith("or("):
+            conditions.append(parse_logic(term[2:], any))
+        else:
+            column, _, condition = term.partition(".")
+            conditions.append(parse_condition(column, condition))
+    return lambda row: combine(condition(row) for condition in conditions)
+
+
+def sort_rows(rows: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    for term in reversed(order.split(",")):
+        column, *modifiers = term.split(".")
+        descending = "desc" in modifiers
+        rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=descending)
+    return rows
+
+
+class PostgrestHandler:
+    def __init__(self, store: Store):
+        self.store = store
+
+    def _filters(self, request: Request) -> List[Callable[[Dict[str, Any]], bool]]:
+        filters = []
+        for key, value in request.query_params.multi_items():
+            if key in ("select", "order", "limit", "offset", "columns", "on_conflict") or "." in key:
+                continue
+            if key == "or":
+                filters.append(parse_logic(value, any))
+            elif key == "and":
+                filters.append(parse_logic(value, all))
+            else:
+                filters.append(parse_condition(key, value))
+        return filters
+
+    def _matching(self, table: str, request: Request) -> List[Dict[str, Any]]:
+        filters = self._filters(request)
+        return [row for row in self.store.tables[table].values() if all(check(row) for check in filters)]
+
+    def _shape(self, table: str, row: Dict[str, Any], select: List, params, path: str = "") -> Dict[str, Any]:
+        shaped = {}
+        for name, source, nested in select:
+            if source == "*":
+                shaped.update(row)
+            elif nested is None:
+                shaped[name] = row.get(source)
+            else:
+                local, remote, single = RELATIONS[(table, source)]
+                related = [other for other in self.store.tables[source].values() if other.get(remote) == row.get(local)]
+                order = params.get(f"{path}{source}.order")
+                if order:
+                    related = sort_rows(related, order)
+                related = [self._shape(source, other, nested, params, f"{path}{source}.") for other in related]
+                shaped[name] = (related[0] if related else None) if single else related
+        return shaped
+
+    def _respond(self, request: Request, table: str, rows: List[Dict[str, Any]], total: Optional[int] = None) -> Response:
+        select = parse_select(request.query_params.get("select", "*"))
+        body = [self._shape(table, row, select, request.query_params) for row in rows]
+        headers = {}
+        if total is not None:
+            headers["Content-Range"] = f"0-{max(len(body) - 1, 0)}/{total}"
+        if "vnd.pgrst.object+json" in request.headers.get("accept", ""):
+            if len(body) != 1:
+                raise PostgrestError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned", f"The result contains {len(body)} rows")
+            return Response(orjson.dumps(body[0]), media_type="application/json", headers=headers)
+        return Response(orjson.dumps(body), media_type="application/json", headers=headers)
+
+    async def table(self, request: Request) -> Response:
+        table = request.path_params["table"]
+        if table not in self.store.tables:
+            raise PostgrestError(404, "42P01", f'relation "{table}" does not exist')
+        method = request.method
+        if method == "GET":
+            rows = self._matching(table, request)
+            total = len(rows) if "count=" in request.headers.get("prefer", "") else None
+            order = request.query_params.get("order")
+            if order:
+                rows = sort_rows(rows, order)
+            offset = int(request.query_params.get("offset", 0))
+            limit = request.query_params.get("limit")
+            rows = rows[offset:None if limit is None else offset + int(limit)]
+            return self._respond(request, table, rows, total)
+        if method == "POST":
+            payload = orjson.loads(await request.body())
+            values = payload if isinstance(payload, list) else [payload]
+            on_conflict = request.query_params.get("on_conflict")
+            if on_conflict and "resolution=ignore-duplicates" in request.headers.get("prefer", ""):
+                # ON CONFLICT DO NOTHING: rows clashing with a stored or an earlier row are skipped.
+                taken = {row.get(on_conflict) for row in self.store.tables[table].values()}
+                kept = []
+                for value in values:
+                    if value.get(on_conflict) not in taken:
+                        taken.add(value.get(on_conflict))
+                        kept.append(value)
+                values = kept
+            for value in values:
+                unique = UNIQUE.get(table)
+                if unique and sum(1 for other in values if other.get(unique) == value.get(unique)) > 1:
+                    raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{table}_{unique}_key"')
+            return self._respond(request, table, [self.store.insert(table, value) for value in values])
+        if method == "PATCH":
+            changes = orjson.loads(await request.body())
+            rows = self._matching(table, request)
+            for row in rows:
+                row.update(changes)
+                bump_version(row)
+            return self._respond(request, table, rows)
+        if method == "DELETE":
+            # Like PostgREST, the representation (and its embeds) is read before cascades apply.
+            rows = self._matching(table, request)
+            response = self._respond(request, table, rows)
+            for row in rows:
+                self.store.delete(table, row["id"])
+            return response
+        return Response(status_code=405)
+
+    # --- Database functions (see migrations/) ---
+
+    def _student_json(self, student: Dict[str, Any]) -> Dict[str, Any]:
+        school_class = self.store.tables["classes"].get(student["class_id"])
+        return {
+            "id": student["id"], "name": student["name"], "points": student["points"], "class_id": student["class_id"],
+            "class": {"id": school_class["id"], "name": school_class["name"]} if school_class else None,
+            "version": student["version"],
+        }
+
+    def authenticate_user(self, p_password: str) -> Optional[Dict[str, Any]]:
+        for admin in self.store.tables["admins"].values():
+            if admin["password"] == p_password:
+                return {key: value for key, value in admin.items() if key not in ("password", "created_at")}
+        for student in self.store.tables["students"].values():
+            if student["password"] == p_password:
+                return {**self._student_json(student), "role": "student"}
+        return None
+
+    def add_student_points(self, p_student_id: int, p_points: int) -> Optional[Dict[str, Any]]:
+        student = self.store.tables["students"].get(p_student_id)
+        if student is None:
+            return None
+        student["points"] = (student["points"] or 0) + p_points
+        bump_version(student)
+        return self._student_json(student)
+
+    def add_student_points_bulk(self, p_awards=None, p_class_id=None, p_points=None) -> List[Dict[str, Any]]:
+        awards: Dict[int, int] = {}
+        for award in p_awards or []:
+            awards[award["student_id"]] = awards.get(award["student_id"], 0) + award["points"]
+        if p_class_id is not None:
+            for student in self.store.tables["students"].values():
+                if student["class_id"] == p_class_id:
+                    awards[student["id"]] = awards.get(student["id"], 0) + p_points
+        updated = []
+        for student_id, points in awards.items():
+            student = self.store.tables["students"].get(student_id)
+            if student is not None:
+                student["points"] = (student["points"] or 0) + points
+                bump_version(student)
+                updated.append(self._student_json(student))
+        return sorted(updated, key=lambda student: (-student["points"], student["id"]))
+
+    async def rpc(self, request: Request) -> Response:
+        function = getattr(self, request.path_params["function"], None)
+        if function is None or request.path_params["function"].startswith("_"):
+            raise PostgrestError(404, "PGRST202", "Could not find the function")
+        body = await request.body()
+        return Response(orjson.dumps(function(**(orjson.loads(body) if body else {}))), media_type="application/json")
+
+
+class StorageHandler:
+    """Resumable (TUS) uploads, kept in memory."""
+
+    def __init__(self):
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+
+    async def create(self, request: Request) -> Response:
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"size": int(request.headers["upload-length"]), "data": bytearray()}
+        location = str(request.url_for("tus_upload", upload_id=upload_id))
+        return Response(status_code=201, headers={"Location": location, "Tus-Resumable": "1.0.0"})
+
+    async def upload(self, request: Request) -> Response:
+        upload = self.uploads.get(request.path_params["upload_id"])
+        if upload is None:
+            return Response(status_code=404)
+        if request.method == "PATCH":
+            if int(request.headers["upload-offset"]) != len(upload["data"]):
+                return Response(status_code=409)
+            upload["data"] += await request.body()
+        return Response(
+            status_code=204 if request.method == "PATCH" else 200,
+            headers={"Upload-Offset": str(len(upload["data"])), "Upload-Length": str(upload["size"]), "Tus-Resumable": "1.0.0"},
+        )
+
+
+def create_app(store: Store) -> Starlette:
+    postgrest = PostgrestHandler(store)
+    storage = StorageHandler()
+
+    async def postgrest_errors(request: Request, exc: PostgrestError) -> Response:
+        return Response(orjson.dumps(exc.body), status_code=exc.status, media_type="application/json")
+
+    return Starlette(
+        routes=[
+            Route("/rest/v1/rpc/{function}", postgrest.rpc, methods=["POST"]),
+            Route("/rest/v1/{table}", postgrest.table, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/storage/v1/upload/resumable", storage.create, methods=["POST"]),
+            Route("/storage/v1/upload/resumable/{upload_id}", storage.upload, methods=["HEAD", "PATCH"], name="tus_upload"),
+        ],
+        exception_handlers={PostgrestError: postgrest_errors},
+    )
+
+
+def add_seed_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--weeks", type=int, default=30)
+    parser.add_argument("--cards-per-week", type=int, default=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    store = Store()
+    store.seed(args.classes, args.students, args.weeks, args.cards_per_week)
+    uvicorn.run(create_app(store), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
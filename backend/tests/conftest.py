@@ -0,0 +1,81 @@
+"""
+Tests run the app against the in-memory Supabase stand-in from benchmarks/,
+served on a local port, so every request goes through the real Supabase
+client. Requests over their query budget fail (QUERY_BUDGET_MODE=raise).
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+import socket
+import threading
+import time
+
+import pytest
+from jose import jwt
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+STANDIN_PORT = _free_port()
+
+# Settings are read when app.core.config is first imported, so they are set before any app import.
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{STANDIN_PORT}",
+    "SUPABASE_KEY": jwt.encode({"role": "service_role"}, "test"),
+    "SECRET_KEY": "test-secret",
+    "SUPABASE_HTTP2": "false",
+    "QUERY_BUDGET_MODE": "raise",
+    "METRICS_ENABLED": "false",
+})
+
+import uvicorn  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.supabase_standin import ADMIN_PASSWORD, Store, create_app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def store():
+    store = Store()
+    store.seed(classes=2, students=10, weeks=0, cards_per_week=0)
+    server = uvicorn.Server(uvicorn.Config(create_app(store), host="127.0.0.1", port=STANDIN_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield store
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def seed(store):
+    """Replaces the stand-in's data and drops the app's caches built from the old data."""
+    from app.services.cache_invalidation import classes_changed, weeks_changed
+
+    def seed(classes: int = 2, students: int = 10, weeks: int = 0, cards_per_week: int = 0) -> Store:
+        store.__init__()
+        store.seed(classes, students, weeks, cards_per_week)
+        weeks_changed()
+        classes_changed()
+        return store
+    return seed
+
+
+@pytest.fixture(scope="session")
+def client(store):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/v1/login/token", data={"username": "admin", "password": ADMIN_PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
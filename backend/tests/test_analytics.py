@@ -0,0 +1,133 @@
+import pytest
+from google.analytics.data_v1beta.types import (
+    BatchRunReportsResponse,
+    DimensionHeader,
+    DimensionValue,
+    MetricHeader,
+    MetricValue,
+    Row,
+    RunReportResponse,
+)
+
+from app.core.config import settings
+from app.services import analytics
+from app.services.analytics import HISTORICAL_REPORTS, fetch_historical_report, process_dimensional_report
+
+
+def report_response(dimensions, metrics, rows):
+    return RunReportResponse(
+        dimension_headers=[DimensionHeader(name=name) for name in dimensions],
+        metric_headers=[MetricHeader(name=name) for name in metrics],
+        rows=[
+            Row(
+                dimension_values=[DimensionValue(value=value) for value in row[:len(dimensions)]],
+                metric_values=[MetricValue(value=value) for value in row[len(dimensions):]],
+            )
+            for row in rows
+        ],
+    )
+
+
+class StubAnalyticsClient:
+    """Stands in for BetaAnalyticsDataClient, answering each report with one row and recording the calls."""
+
+    def __init__(self):
+        self.batches = []
+        self.realtime_calls = 0
+
+    def batch_run_reports(self, request):
+        self.batches.append(request)
+        responses = []
+        for report in request.requests:
+            dimensions = [dimension.name for dimension in report.dimensions]
+            metrics = [metric.name for metric in report.metrics]
+            responses.append(report_response(dimensions, metrics, [["d"] * len(dimensions) + ["7"] * len(metrics)]))
+        return BatchRunReportsResponse(reports=responses)
+
+    def run_realtime_report(self, request):
+        self.realtime_calls += 1
+        return report_response([], ["activeUsers", "screenViews"], [["2", "5"]])
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    stub = StubAnalyticsClient()
+    monkeypatch.setattr(analytics, "get_analytics_client", lambda: stub)
+    for name in ("GA4_PROJECT_ID", "GA4_CLIENT_EMAIL", "GA4_PRIVATE_KEY", "GA_PROPERTY_ID"):
+        monkeypatch.setattr(settings, name, "test")
+    monkeypatch.setattr(analytics, "historical_report_caches", {})
+    monkeypatch.setattr(analytics.realtime_overview_cache, "_fetched_at", None)
+    return stub
+
+
+def test_historical_reports_are_one_batch_call():
+    stub = StubAnalyticsClient()
+
+    report = fetch_historical_report("7daysAgo", "today", client=stub)
+
+    [batch] = stub.batches
+    assert len(batch.requests) == len(HISTORICAL_REPORTS) == 4
+    assert all(request.date_ranges[0].start_date == "7daysAgo" for request in batch.requests)
+    assert report["overview"] == {"totalUsers": "7"}
+    assert report["trends"]["usersPerDay"] == [{"date": "d", "users": "7"}]
+    assert report["content"]["byPage"] == [{"unifiedScreenName": "d", "views": "7", "sessions": "7"}]
+
+
+def test_dimensional_reports_keep_every_dimension():
+    response = report_response(["country", "date"], ["activeUsers"], [["SA", "20240101", "3"]])
+
+    assert process_dimensional_report(response, {"activeUsers": "users"}) == [
+        {"country": "SA", "date": "20240101", "users": "3"}
+    ]
+
+
+def test_reports_filter_leaves_other_sections_empty(client, seed, admin_headers, stub_client):
+    seed()
+
+    response = client.get("/api/v1/admin/analytics", params={"reports": ["users_per_week"]}, headers=admin_headers)
+
+    assert response.status_code == 200
+    [batch] = stub_client.batches
+    assert [request.dimensions[0].name for request in batch.requests] == ["week"]
+    assert stub_client.realtime_calls == 0
+    report = response.json()
+    assert report["overview"] == {}
+    assert report["trends"] == {"usersPerDay": [], "usersPerWeek": [{"week": "d", "users": "7"}]}
+    assert report["content"] == {"byPage": []}
+
+
+@pytest.mark.parametrize("params", [
+    {"start_date": "last week"},
+    {"end_date": "2024-1-1"},
+    {"end_date": "today\n"},
+    {"reports": ["total_users", "bounce_rate"]},
+])
+def test_invalid_parameters_are_400(client, seed, admin_headers, stub_client, params):
+    seed()
+
+    response = client.get("/api/v1/admin/analytics", params=params, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert stub_client.batches == []
+
+
+def test_each_range_and_report_selection_is_cached_separately(client, seed, admin_headers, stub_client):
+    seed()
+    requests = [
+        {"start_date": "7daysAgo", "end_date": "today", "reports": ["total_users"]},
+        {"start_date": "2024-01-01", "end_date": "2024-01-31", "reports": ["total_users"]},
+        {"start_date": "7daysAgo", "end_date": "today", "reports": ["total_users", "users_per_day"]},
+    ]
+
+    for params in requests * 2:
+        assert client.get("/api/v1/admin/analytics", params=params, headers=admin_headers).status_code == 200
+
+    # Three distinct keys, each fetched once; the repeats are served from the caches.
+    assert set(analytics.historical_report_caches) == {
+        ("7daysAgo", "today", ("total_users",)),
+        ("2024-01-01", "2024-01-31", ("total_users",)),
+        ("7daysAgo", "today", ("total_users", "users_per_day")),
+    }
+    assert [(batch.requests[0].date_ranges[0].start_date, len(batch.requests)) for batch in stub_client.batches] == [
+        ("7daysAgo", 1), ("2024-01-01", 1), ("7daysAgo", 2),
+    ]
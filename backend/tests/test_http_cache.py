@@ -0,0 +1,53 @@
+import pytest
+
+from app.api.http_cache import accepted_encoding
+
+ENCODINGS = {"br": b"", "gzip": b""}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("br, gzip", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("*", "br"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_accepted_encoding_honours_q_values(header, expected):
+    assert accepted_encoding(header, ENCODINGS) == expected
+
+
+def test_weeks_variants_have_their_own_etags(client, seed):
+    seed(weeks=10, cards_per_week=3)
+
+    compressed = client.get("/api/v1/weeks/", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/v1/weeks/", headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    assert compressed.headers["etag"] != plain.headers["etag"]
+
+    revalidated = client.get("/api/v1/weeks/", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]})
+    assert revalidated.status_code == 304
+    # The ETag of the gzip variant does not validate the uncompressed one.
+    assert client.get("/api/v1/weeks/", headers={"Accept-Encoding": "identity", "If-None-Match": compressed.headers["etag"]}).status_code == 200
+
+
+def test_compressed_leaderboard_has_a_weak_etag(client, seed):
+    seed(students=200)
+
+    compressed = client.get("/api/v1/leaderboard/", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/v1/leaderboard/", headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    # The middleware compresses after the ETag is set, so it is weak: both bodies are equivalent, not identical.
+    assert compressed.headers["etag"].startswith('W/"')
+    assert compressed.headers["etag"] == plain.headers["etag"]
+
+    for encoding in ("gzip", "identity"):
+        revalidated = client.get("/api/v1/leaderboard/", headers={"Accept-Encoding": encoding, "If-None-Match": plain.headers["etag"]})
+        assert revalidated.status_code == 304
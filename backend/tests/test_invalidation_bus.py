@@ -0,0 +1,193 @@
+"""
+Two or three "workers" in one process, each with its own invalidation bus
+and caches, connected by a shared transport. The handlers of
+app/services/cache_invalidation.py run against the caches of the worker
+that is handling the message.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+
+from app.services import cache_invalidation, invalidation_bus as bus_module
+from app.services.content_versions import ContentVersions, WEEKS
+from app.services.invalidation_bus import InvalidationBus, MemoryTransport, UnixSocketTransport
+from app.services.leaderboard_cache import LeaderboardCache
+from app.services.profile_cache import ProfileCache
+
+
+def student(student_id, points, version=1):
+    return {"id": student_id, "name": f"Student {student_id}", "points": points, "class_id": None, "class": None, "version": version}
+
+
+class Worker:
+    """One worker's bus and caches. cache_invalidation acts on them while the worker is active."""
+
+    def __init__(self, students=()):
+        self.bus = InvalidationBus()
+        self.leaderboard = LeaderboardCache()
+        self.leaderboard.load([dict(row) for row in students])
+        self.versions = ContentVersions(maxsize=100)
+        self.profiles = ProfileCache(ttl=60)
+        for topic, handler in cache_invalidation.invalidation_bus._handlers.items():
+            self.bus.register(topic, self._bind(handler))
+        for handler in cache_invalidation.invalidation_bus._reset_handlers:
+            self.bus.register_reset(self._bind(handler))
+
+    def _bind(self, handler):
+        def bound(*args):
+            with self.active():
+                handler(*args)
+        return bound
+
+    @contextmanager
+    def active(self):
+        with mock.patch.multiple(
+            cache_invalidation,
+            invalidation_bus=self.bus,
+            leaderboard_cache=self.leaderboard,
+            content_versions=self.versions,
+            profile_cache=self.profiles,
+        ):
+            yield
+
+    def points(self, student_id):
+        cached = self.leaderboard.get(student_id)
+        return None if cached is None else cached["points"]
+
+
+async def until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def start_memory_workers(count, students=()):
+    hub = []
+    workers = [Worker(students) for _ in range(count)]
+    for worker in workers:
+        await worker.bus.start(MemoryTransport(hub))
+    return workers
+
+
+def test_writes_in_one_worker_update_the_others():
+    async def main():
+        a, b = await start_memory_workers(2, [student(1, 10), student(2, 20)])
+
+        with a.active():
+            cache_invalidation.students_changed([student(1, 30, version=2)])
+            cache_invalidation.weeks_changed()
+        await until(lambda: b.points(1) == 30 and b.versions.version(WEEKS) == 1)
+
+        assert [row["id"] for row in b.leaderboard.get_page()] == [1, 2]
+        # A worker's own messages are not applied a second time.
+        assert a.versions.version(WEEKS) == 1
+
+        with b.active():
+            cache_invalidation.student_removed(2)
+        await until(lambda: a.leaderboard.get(2) is None)
+        assert a.leaderboard.count() == 1
+
+        for worker in (a, b):
+            await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_out_of_order_copies_keep_the_newest_row():
+    async def main():
+        a, b = await start_memory_workers(2, [student(1, 10)])
+
+        # Two concurrent awards whose results are published newest first.
+        with a.active():
+            cache_invalidation.students_changed([student(1, 15, version=3)])
+            cache_invalidation.students_changed([student(1, 12, version=2)])
+        with a.active():
+            cache_invalidation.weeks_changed()
+        await until(lambda: b.versions.version(WEEKS) == 1)
+
+        assert a.points(1) == b.points(1) == 15
+
+        for worker in (a, b):
+            await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_oversized_students_message_falls_back_to_all_students():
+    async def main():
+        a, b = await start_memory_workers(2, [student(i, i) for i in range(1, 4)])
+        a.bus.transport.max_message_size = 500
+        b.profiles.set("student", 1, {"id": 1})
+
+        with a.active():
+            cache_invalidation.students_changed([student(i, 100 + i, version=2) for i in range(1, 4)] * 10)
+        await until(lambda: not b.leaderboard.is_loaded)
+
+        assert b.profiles.get("student", 1) is None
+        # The writing worker applied the rows themselves.
+        assert a.points(3) == 103
+
+        for worker in (a, b):
+            await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_classes_changed_drops_the_other_leaderboards():
+    async def main():
+        a, b = await start_memory_workers(2, [student(1, 10)])
+
+        with a.active():
+            cache_invalidation.classes_changed()
+        await until(lambda: not b.leaderboard.is_loaded)
+
+        for worker in (a, b):
+            await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_unix_transport_survives_the_broker_exiting(tmp_path, monkeypatch):
+    monkeypatch.setattr(bus_module, "RECONNECT_DELAY", 0.01)
+    path = str(tmp_path / "invalidation.sock")
+
+    async def main():
+        broker, b = Worker([student(1, 10)]), Worker([student(1, 10)])
+        await broker.bus.start(UnixSocketTransport(path))
+        await until(lambda: broker.bus.transport._connected.is_set())
+        await b.bus.start(UnixSocketTransport(path))
+        await until(lambda: b.bus.transport._connected.is_set())
+
+        with broker.active():
+            cache_invalidation.students_changed([student(1, 20, version=2)])
+        await until(lambda: b.points(1) == 20)
+
+        # The broker's worker exits: b takes over as broker and resets its caches,
+        # since messages may have been lost in between.
+        await broker.bus.stop()
+        await until(lambda: b.bus.transport._server is not None and b.bus.transport._connected.is_set())
+        assert not b.leaderboard.is_loaded
+        assert b.versions.version(WEEKS) == 1
+
+        c = Worker()
+        await c.bus.start(UnixSocketTransport(path))
+        await until(lambda: c.bus.transport._connected.is_set())
+        with c.active():
+            cache_invalidation.weeks_changed()
+        await until(lambda: b.versions.version(WEEKS) == 2)
+
+        for worker in (b, c):
+            await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_unknown_transport_is_rejected(monkeypatch):
+    monkeypatch.setattr(bus_module.settings, "INVALIDATION_TRANSPORT", "carrier-pigeon")
+    with pytest.raises(ValueError):
+        bus_module.build_transport()
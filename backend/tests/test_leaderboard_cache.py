@@ -0,0 +1,144 @@
+import asyncio
+
+from app.services.leaderboard_cache import LeaderboardCache
+
+
+def student(student_id, points, version=1):
+    return {"id": student_id, "name": f"Student {student_id}", "points": points, "class_id": None, "version": version}
+
+
+class SlowFetch:
+    """A fetch of all students that waits until released, counting its calls."""
+
+    def __init__(self, students):
+        self.students = students
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return [dict(row) for row in self.students]
+
+
+def ranking(cache):
+    return [(row["id"], row["points"], row["rank"]) for row in cache.get_page()]
+
+
+def test_tied_points_share_a_rank():
+    cache = LeaderboardCache()
+    cache.load([student(1, 50), student(2, 40), student(3, 40), student(4, 10)])
+
+    assert ranking(cache) == [(1, 50, 1), (2, 40, 2), (3, 40, 2), (4, 10, 4)]
+
+    cache.upsert(student(4, 40, version=2))
+    assert ranking(cache) == [(1, 50, 1), (2, 40, 2), (3, 40, 2), (4, 40, 2)]
+
+
+def test_older_copy_of_a_student_is_ignored():
+    cache = LeaderboardCache()
+    cache.load([student(1, 10, version=3)])
+
+    cache.upsert(student(1, 99, version=2))
+    assert cache.get(1)["points"] == 10
+
+    cache.upsert(student(1, 20, version=4))
+    assert cache.get(1)["points"] == 20
+
+
+def test_removed_student_is_not_added_back_by_a_stale_copy():
+    cache = LeaderboardCache()
+    cache.load([student(1, 10), student(2, 20)])
+
+    cache.remove(1)
+    cache.upsert(student(1, 30, version=2))
+
+    assert cache.get(1) is None
+    assert ranking(cache) == [(2, 20, 1)]
+
+
+def test_concurrent_reads_share_one_load():
+    async def main():
+        cache = LeaderboardCache()
+        fetch = SlowFetch([student(1, 10)])
+        readers = [asyncio.create_task(cache.ensure_loaded(fetch)) for _ in range(10)]
+        await fetch.started.wait()
+        fetch.release.set()
+        await asyncio.gather(*readers)
+        return cache, fetch
+
+    cache, fetch = asyncio.run(main())
+
+    assert fetch.calls == 1
+    assert ranking(cache) == [(1, 10, 1)]
+
+
+def test_writes_during_a_load_are_applied_on_top_of_it():
+    async def main():
+        cache = LeaderboardCache()
+        # The rows are read before the writes below, so they are older than them.
+        fetch = SlowFetch([student(1, 10), student(2, 20), student(3, 30)])
+        reader = asyncio.create_task(cache.ensure_loaded(fetch))
+        await fetch.started.wait()
+
+        cache.upsert(student(1, 50, version=2))
+        cache.remove(2)
+        cache.upsert(student(4, 5))
+        # An older copy than the pending one is dropped.
+        cache.upsert(student(1, 15, version=1))
+
+        fetch.release.set()
+        await reader
+        return cache
+
+    cache = asyncio.run(main())
+
+    assert ranking(cache) == [(1, 50, 1), (3, 30, 2), (4, 5, 3)]
+
+
+def test_invalidate_during_a_load_discards_its_rows():
+    async def main():
+        cache = LeaderboardCache()
+        fetch = SlowFetch([student(1, 10)])
+        reader = asyncio.create_task(cache.ensure_loaded(fetch))
+        await fetch.started.wait()
+
+        cache.invalidate()
+        # The read in flight may predate the change, so the reader fetches again.
+        fetch.students = [student(1, 10), student(2, 20)]
+        fetch.release.set()
+        await reader
+        return cache, fetch
+
+    cache, fetch = asyncio.run(main())
+
+    assert fetch.calls == 2
+    assert ranking(cache) == [(2, 20, 1), (1, 10, 2)]
+
+
+def test_stale_load_returns_false():
+    cache = LeaderboardCache()
+    cache.load([student(1, 10)])
+    generation = cache._generation
+
+    cache.invalidate()
+
+    assert cache.load([student(1, 10)], generation) is False
+    assert not cache.is_loaded
+    assert cache.load([student(2, 20)], cache._generation) is True
+    assert ranking(cache) == [(2, 20, 1)]
+
+
+def test_removed_ids_are_forgotten_after_a_full_load():
+    cache = LeaderboardCache()
+    cache.load([student(1, 10), student(2, 20)])
+    cache.remove(1)
+    cache.remove(2)
+    assert cache._removed == {1, 2}
+
+    cache.invalidate()
+    cache.load([])
+
+    assert cache._removed == set()
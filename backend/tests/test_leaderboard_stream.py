@@ -0,0 +1,103 @@
+import asyncio
+
+import orjson
+
+from app.core.config import settings
+from app.services.content_versions import content_versions, LEADERBOARD
+from app.services.leaderboard_stream import LeaderboardBroadcaster, RESYNC
+
+
+def delta(student_id, points):
+    return {"type": "delta", "students": [{"id": student_id, "points": points, "rank": 1}], "removed": []}
+
+
+def parse(event):
+    lines = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return lines["event"], orjson.loads(lines["data"])
+
+
+class SlowLoad:
+    """Loads the ranked students after a pause, counting its calls."""
+
+    def __init__(self, students):
+        self.students = students
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.students
+
+
+def test_slow_subscriber_is_resynced_and_others_keep_their_deltas():
+    async def main():
+        broadcaster = LeaderboardBroadcaster(queue_size=3)
+        fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+
+        received = []
+        for points in range(5):
+            broadcaster.publish_change(delta(1, points))
+            received.append(await fast.next(timeout=1))
+
+        # The slow subscriber never read: on overflow its backlog was dropped for a resync,
+        # and the deltas after it are applied on top of the new snapshot.
+        assert await slow.next(timeout=1) is RESYNC
+        assert parse(await slow.next(timeout=1)) == ("delta", {"students": [{"id": 1, "points": 4, "rank": 1}], "removed": []})
+        assert slow.queue.empty()
+        return received
+
+    received = asyncio.run(main())
+
+    assert [parse(event)[1]["students"][0]["points"] for event in received] == [0, 1, 2, 3, 4]
+
+
+def test_reset_resyncs_every_subscriber():
+    async def main():
+        broadcaster = LeaderboardBroadcaster(queue_size=3)
+        subscriptions = [broadcaster.subscribe() for _ in range(3)]
+        broadcaster.publish_change(delta(1, 1))
+
+        broadcaster.publish_change({"type": "reset"})
+
+        return [await subscription.next(timeout=1) for subscription in subscriptions]
+
+    assert asyncio.run(main()) == [RESYNC] * 3
+
+
+def test_snapshot_is_built_once_per_leaderboard_version():
+    async def main():
+        broadcaster = LeaderboardBroadcaster(queue_size=3)
+        load = SlowLoad([{"id": 1, "points": 10, "rank": 1}])
+
+        events = await asyncio.gather(*(broadcaster.snapshot_event(load) for _ in range(20)))
+        assert load.calls == 1
+        assert len(set(events)) == 1
+        assert parse(events[0]) == ("snapshot", [{"id": 1, "points": 10, "rank": 1}])
+
+        # Served from the last snapshot until the leaderboard changes.
+        await broadcaster.snapshot_event(load)
+        assert load.calls == 1
+        content_versions.bump(LEADERBOARD)
+        await broadcaster.snapshot_event(load)
+        assert load.calls == 2
+
+        # A build that started before a change is not shared with readers after it.
+        content_versions.bump(LEADERBOARD)
+        before = asyncio.create_task(broadcaster.snapshot_event(load))
+        await asyncio.sleep(0)
+        content_versions.bump(LEADERBOARD)
+        load.students = [{"id": 1, "points": 20, "rank": 1}]
+        after = await broadcaster.snapshot_event(load)
+        await before
+        assert load.calls == 4
+        assert parse(after)[1][0]["points"] == 20
+
+    asyncio.run(main())
+
+
+def test_stream_is_refused_when_the_client_limit_is_reached(client, monkeypatch):
+    monkeypatch.setattr(settings, "LEADERBOARD_STREAM_MAX_CLIENTS", 0)
+
+    response = client.get("/api/v1/leaderboard/stream")
+
+    assert response.status_code == 503
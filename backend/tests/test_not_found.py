@@ -0,0 +1,33 @@
+import pytest
+
+from app.core.security import create_access_token
+
+MISSING_ID = 999
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", f"/api/v1/admin/students/{MISSING_ID}", None),
+    ("PUT", f"/api/v1/admin/students/{MISSING_ID}", {}),
+    ("PUT", f"/api/v1/admin/weeks/{MISSING_ID}", {}),
+    ("GET", f"/api/v1/admin/admins/{MISSING_ID}", None),
+    ("PUT", f"/api/v1/admin/admins/{MISSING_ID}", {}),
+])
+def test_missing_rows_are_404(client, seed, admin_headers, method, path, body):
+    seed()
+
+    response = client.request(method, path, json=body, headers=admin_headers)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("claims", [
+    {"id": str(MISSING_ID), "role": "student"},
+    {"id": str(MISSING_ID), "role": "admin"},
+])
+def test_fresh_profile_of_a_deleted_user_is_404(client, seed, claims):
+    seed()
+    headers = {"Authorization": f"Bearer {create_access_token(claims)}"}
+
+    response = client.get("/api/v1/login/me", params={"fresh": "true"}, headers=headers)
+
+    assert response.status_code == 404
@@ -0,0 +1,76 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.query_budget import QueryBudgetMiddleware, assert_max_queries, query_budget, record_query
+from benchmarks.supabase_standin import student_password
+
+
+def login(client, password):
+    response = client.post("/api/v1/login/token", data={"username": "user", "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_login_is_one_query(client, seed):
+    seed()
+    with assert_max_queries(1):
+        login(client, student_password(3))
+
+
+def test_student_dashboard_is_at_most_one_query(client, seed):
+    seed()
+    headers = login(client, student_password(3))
+
+    with assert_max_queries(1):
+        response = client.get("/api/v1/dashboard/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == 3
+
+
+def test_leaderboard_is_one_query_cold_and_none_warm(client, seed):
+    seed(students=40)
+
+    with assert_max_queries(1):
+        assert len(client.get("/api/v1/leaderboard/").json()) == 40
+    with assert_max_queries(0):
+        assert len(client.get("/api/v1/leaderboard/?limit=5&fields=id,points,rank").json()) == 5
+
+
+def test_writes_are_one_round_trip(client, seed, admin_headers):
+    seed()
+
+    with assert_max_queries(1):
+        response = client.post("/api/v1/admin/students/3/add-points", json={"points": 5}, headers=admin_headers)
+    assert response.status_code == 200
+
+    with assert_max_queries(1):
+        response = client.put("/api/v1/admin/students/3", json={"name": "Renamed"}, headers=admin_headers)
+    assert response.json()["name"] == "Renamed"
+
+    with assert_max_queries(1):
+        response = client.post("/api/v1/admin/students/add-points", json={"class_id": 1, "points": 2}, headers=admin_headers)
+    assert response.status_code == 200
+
+
+def test_warn_mode_logs_the_call_that_went_over_budget(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "warn")
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware)
+
+    @app.get("/two-calls")
+    @query_budget(1)
+    async def two_calls():
+        record_query("postgrest", "students", "select")
+        record_query("postgrest", "students", "select")
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_budget"):
+        assert TestClient(app).get("/two-calls").status_code == 200
+
+    [record] = caplog.records
+    assert "GET /two-calls made 2 upstream calls (budget 1)" in record.getMessage()
+    assert "Call that went over budget" in record.getMessage()
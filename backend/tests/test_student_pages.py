@@ -0,0 +1,71 @@
+import pytest
+
+LEADERBOARD = "/api/v1/leaderboard/"
+STUDENTS = "/api/v1/admin/students"
+
+
+@pytest.fixture
+def tied_students(seed):
+    """Eleven students on four point values, so pages break inside runs of ties."""
+    store = seed(students=11)
+    for student_id, student in store.tables["students"].items():
+        student["points"] = [50, 30, 30, 30, 30, 10, 10, 10, 0, 0, 0][student_id - 1]
+    return store
+
+
+def all_pages(client, path, limit, headers=None):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("path", [LEADERBOARD, STUDENTS])
+def test_cursor_pages_cover_every_student_once_across_ties(client, admin_headers, tied_students, path):
+    expected = [row["id"] for row in client.get(path, headers=admin_headers).json()]
+
+    pages = all_pages(client, path, limit=3, headers=admin_headers)
+
+    assert [len(page.json()) for page in pages] == [3, 3, 3, 2]
+    assert [row["id"] for page in pages for row in page.json()] == expected
+    assert sorted(expected) == list(range(1, 12))
+    points = [row["points"] for page in pages for row in page.json()]
+    assert points == sorted(points, reverse=True)
+
+
+@pytest.mark.parametrize("path", [LEADERBOARD, STUDENTS])
+def test_last_page_has_no_next_cursor(client, admin_headers, tied_students, path):
+    exact = client.get(path, params={"limit": 11}, headers=admin_headers)
+    assert len(exact.json()) == 11
+    assert "x-next-cursor" not in exact.headers
+
+    assert "x-next-cursor" in client.get(path, params={"limit": 10}, headers=admin_headers).headers
+
+
+@pytest.mark.parametrize("path", [LEADERBOARD, STUDENTS])
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bm9wZQ", "!!!"])
+def test_malformed_cursor_is_400(client, admin_headers, tied_students, path, cursor):
+    response = client.get(path, params={"limit": 3, "cursor": cursor}, headers=admin_headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", [LEADERBOARD, STUDENTS])
+def test_fields_limit_the_returned_keys(client, admin_headers, tied_students, path):
+    response = client.get(path, params={"limit": 2, "fields": "id, points"}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert [set(row) for row in response.json()] == [{"id", "points"}] * 2
+
+
+@pytest.mark.parametrize("path", [LEADERBOARD, STUDENTS])
+@pytest.mark.parametrize("fields", ["", ",", " , ", "id,password"])
+def test_empty_or_unknown_field_selection_is_400(client, admin_headers, tied_students, path, fields):
+    response = client.get(path, params={"fields": fields}, headers=admin_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,25 @@
+import asyncio
+
+from app.db import supabase
+
+
+def test_concurrent_first_calls_create_one_client(monkeypatch):
+    created = []
+
+    async def create_supabase_client():
+        await asyncio.sleep(0.01)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(supabase, "_client", None)
+    # A lock that waiters used is tied to their event loop, so the test gets its own.
+    monkeypatch.setattr(supabase, "_client_lock", asyncio.Lock())
+    monkeypatch.setattr(supabase, "create_supabase_client", create_supabase_client)
+
+    async def main():
+        return await asyncio.gather(*(supabase.get_supabase_client() for _ in range(10)))
+
+    clients = asyncio.run(main())
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.api import deps
+from app.api.deps import TokenCache, TokenData, get_current_user, token_cache
+from app.core.config import settings
+from app.core.security import create_access_token
+
+
+def claims(user_id):
+    return TokenData(id=str(user_id), role="student")
+
+
+def test_least_recently_used_token_is_evicted_at_capacity():
+    cache = TokenCache(maxsize=2)
+    cache.set("a", claims(1), None)
+    cache.set("b", claims(2), None)
+    assert cache.get("a") == claims(1)
+
+    cache.set("c", claims(3), None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == claims(1)
+    assert cache.get("c") == claims(3)
+
+
+def test_cached_token_expires_at_exp(monkeypatch):
+    cache = TokenCache(maxsize=10)
+    cache.set("token", claims(1), expires_at=1000.0)
+
+    monkeypatch.setattr(deps.time, "time", lambda: 999.5)
+    assert cache.get("token") == claims(1)
+
+    monkeypatch.setattr(deps.time, "time", lambda: 1000.0)
+    assert cache.get("token") is None
+    assert len(cache._entries) == 0
+
+
+def test_zero_size_disables_the_cache():
+    cache = TokenCache(maxsize=0)
+    cache.set("token", claims(1), None)
+
+    assert cache.get("token") is None
+
+
+def test_token_signed_with_another_key_is_rejected_after_a_cache_hit():
+    token_cache.clear()
+    valid = create_access_token({"id": "1", "role": "admin"}, expires_delta=timedelta(minutes=5))
+    forged = jwt.encode(jwt.get_unverified_claims(valid), "not-the-secret", algorithm=settings.ALGORITHM)
+
+    async def main():
+        first = await get_current_user(valid)
+        # The second lookup is a cache hit. The forged token has the same claims but another
+        # signature, so it misses the cache and fails verification.
+        assert await get_current_user(valid) is first
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(forged)
+        return error.value
+
+    assert asyncio.run(main()).status_code == 403
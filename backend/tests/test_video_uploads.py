@@ -0,0 +1,45 @@
+from app.core.config import settings
+
+
+def start_upload(client, admin_headers, size):
+    response = client.post(
+        "/api/v1/admin/weeks/1/video/uploads",
+        json={"filename": "lesson.mp4", "content_type": "video/mp4", "size": size},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+
+def test_chunk_over_the_limit_without_content_length_is_rejected(client, seed, admin_headers, monkeypatch):
+    seed(weeks=1)
+    monkeypatch.setattr(settings, "VIDEO_UPLOAD_CHUNK_SIZE", 1024)
+    upload_id = start_upload(client, admin_headers, size=4096)
+
+    def body():
+        # A generator body is sent with Transfer-Encoding: chunked and no Content-Length.
+        for _ in range(4):
+            yield b"x" * 512
+
+    response = client.patch(
+        f"/api/v1/admin/weeks/1/video/uploads/{upload_id}",
+        content=body(),
+        headers={**admin_headers, "Upload-Offset": "0"},
+    )
+    assert response.status_code == 413
+
+
+def test_chunks_within_the_limit_complete_the_upload(client, seed, admin_headers, monkeypatch):
+    seed(weeks=1)
+    monkeypatch.setattr(settings, "VIDEO_UPLOAD_CHUNK_SIZE", 1024)
+    upload_id = start_upload(client, admin_headers, size=1536)
+
+    for offset, size in ((0, 1024), (1024, 512)):
+        response = client.patch(
+            f"/api/v1/admin/weeks/1/video/uploads/{upload_id}",
+            content=b"x" * size,
+            headers={**admin_headers, "Upload-Offset": str(offset)},
+        )
+        assert response.status_code == 200
+    assert response.json()["complete"] is True
+    assert response.json()["week"]["video_url"]
@@ -0,0 +1,51 @@
+import pytest
+
+from app.core.query_budget import assert_max_queries
+from app.services.cache_invalidation import weeks_changed
+
+
+@pytest.mark.parametrize("weeks", [1, 25])
+def test_weeks_catalogue_is_one_query_whatever_the_number_of_weeks(client, seed, weeks):
+    seed(weeks=weeks, cards_per_week=4)
+
+    with assert_max_queries(1):
+        response = client.get("/api/v1/weeks/")
+
+    assert response.status_code == 200
+    assert len(response.json()) == weeks
+    assert all(len(week["content_cards"]) == 4 for week in response.json())
+
+
+def test_weeks_catalogue_is_served_from_the_snapshot_until_a_week_changes(client, seed):
+    seed(weeks=3, cards_per_week=2)
+    client.get("/api/v1/weeks/")
+
+    with assert_max_queries(0):
+        assert client.get("/api/v1/weeks/all").status_code == 200
+
+    weeks_changed()
+    with assert_max_queries(1) as calls:
+        assert client.get("/api/v1/weeks/all").status_code == 200
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("weeks", [1, 25])
+def test_week_by_id_is_one_query(client, seed, weeks):
+    seed(weeks=weeks, cards_per_week=4)
+
+    with assert_max_queries(1):
+        response = client.get(f"/api/v1/weeks/{weeks}")
+
+    assert response.status_code == 200
+    assert [card["id"] for card in response.json()["content_cards"]] == sorted(
+        card["id"] for card in response.json()["content_cards"]
+    )
+
+
+def test_missing_week_is_404(client, seed):
+    seed(weeks=2)
+
+    with assert_max_queries(1):
+        response = client.get("/api/v1/weeks/999")
+
+    assert response.status_code == 404
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.services.content_versions import content_versions, WEEKS
+from app.services.weeks_snapshot import WeeksSnapshot
+
+
+def week(week_id, title):
+    return {"id": week_id, "week_number": week_id, "title": title, "video_url": None, "is_locked": False, "content_cards": []}
+
+
+class SlowLoad:
+    """Loads the weeks after a pause, counting its calls."""
+
+    def __init__(self, weeks):
+        self.weeks = weeks
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.weeks
+
+
+def test_concurrent_reads_after_a_change_share_one_build():
+    async def main():
+        snapshot = WeeksSnapshot()
+        load = SlowLoad([week(1, "Week 1")])
+        content_versions.bump(WEEKS)
+
+        bodies = await asyncio.gather(*(snapshot.get(load) for _ in range(20)))
+        assert load.calls == 1
+        assert len({id(body) for body in bodies}) == 1
+
+        # Served from memory until the weeks change again.
+        await snapshot.get(load)
+        assert load.calls == 1
+        content_versions.bump(WEEKS)
+        await snapshot.get(load)
+        assert load.calls == 2
+
+    asyncio.run(main())
+
+
+def test_build_started_before_a_change_is_not_shared():
+    async def main():
+        snapshot = WeeksSnapshot()
+        load = SlowLoad([week(1, "Old title")])
+        content_versions.bump(WEEKS)
+
+        before = asyncio.create_task(snapshot.get(load))
+        await asyncio.sleep(0)
+        content_versions.bump(WEEKS)
+        load.weeks = [week(1, "New title")]
+        after = await snapshot.get(load)
+        await before
+
+        assert load.calls == 2
+        assert b"New title" in after.body
+        assert snapshot.current() is after
+
+    asyncio.run(main())
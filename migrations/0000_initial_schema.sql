@@ -1,24 +1,24 @@
--- SQL Migration for Ghars Project on Supabase
+-- Migration: initial schema
 --
--- Instructions:
--- 1. Go to your Supabase project's "SQL Editor".s
--- 2. Click on "New query".
--- 3. Copy and paste the entire content of this file into the editor.
--- 4. Click "Run" to execute the script and create your database tables.
--- 5. After running this, go to "Storage" and create a new public bucket named `videos` for the weekly video uploads.
-
--- Drop existing tables if they exist to start fresh
-DROP TABLE IF EXISTS content_cards, weeks, students, classes, admins CASCADE;
+-- Creates the tables of the Ghars Project and the default admin. Replaces
+-- the old drop-and-recreate DB.sql: every migration can be re-run safely on
+-- an existing database, so databases created from DB.sql are brought up to
+-- date by applying all of them.
+--
+-- Apply pending migrations in order with `python -m app.db.migrate` (from
+-- the backend directory, with DATABASE_URL set), or paste each file, in
+-- order, into the Supabase "SQL Editor". Afterwards, create a public Storage
+-- bucket named `videos` for the weekly video uploads.
 
 -- Table for Classes
-CREATE TABLE classes (
+CREATE TABLE IF NOT EXISTS classes (
     id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     name TEXT NOT NULL UNIQUE,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 -- Table for Admin Users
-CREATE TABLE admins (
+CREATE TABLE IF NOT EXISTS admins (
     id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     name TEXT NOT NULL,
     password TEXT NOT NULL UNIQUE,
@@ -33,7 +33,7 @@ CREATE TABLE admins (
 );
 
 -- Table for Students
-CREATE TABLE students (
+CREATE TABLE IF NOT EXISTS students (
     id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     password TEXT NOT NULL UNIQUE,
     name TEXT NOT NULL,
@@ -44,7 +44,7 @@ CREATE TABLE students (
 );
 
 -- Table for Weeks
-CREATE TABLE weeks (
+CREATE TABLE IF NOT EXISTS weeks (
     id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     week_number INT NOT NULL,
     title TEXT NOT NULL,
@@ -54,7 +54,7 @@ CREATE TABLE weeks (
 );
 
 -- Table for Content Cards
-CREATE TABLE content_cards (
+CREATE TABLE IF NOT EXISTS content_cards (
     id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     week_id BIGINT NOT NULL REFERENCES weeks(id) ON DELETE CASCADE,
     title TEXT NOT NULL,
@@ -62,13 +62,7 @@ CREATE TABLE content_cards (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Initial Data
-INSERT INTO admins (name, password, role, can_view_analytics) VALUES ('Default Admin', 'Xnaf*123', 'admin', TRUE);
-
--- Sample Data (Optional)
-INSERT INTO classes (name) VALUES ('Class A'), ('Class B');
-INSERT INTO students (password, name, class_id, points) VALUES
-('student123', 'John Doe', 1, 100),
-('student456', 'Jane Smith', 2, 150);
-INSERT INTO weeks (week_number, title, is_locked) VALUES (1, 'The Value of Respect', false);
-INSERT INTO content_cards (week_id, title, description) VALUES (1, 'Respect in Dialogue', 'Always listen to others and value their opinions.');
+-- Default admin (change its password after the first login)
+INSERT INTO admins (name, password, role, can_view_analytics)
+SELECT 'Default Admin', 'Xnaf*123', 'admin', TRUE
+WHERE NOT EXISTS (SELECT 1 FROM admins);
@@ -0,0 +1,30 @@
+-- Migration: atomic point awards
+--
+-- Adds the `add_student_points` function used by StudentService.add_points.
+-- The increment happens in a single UPDATE, so concurrent awards to the same
+-- student cannot overwrite each other, and the updated student (with its
+-- class) is returned in the same round trip. Returns NULL if the student
+-- does not exist.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE OR REPLACE FUNCTION add_student_points(p_student_id BIGINT, p_points INT)
+RETURNS JSON
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE students
+        SET points = COALESCE(points, 0) + p_points
+        WHERE id = p_student_id
+        RETURNING id, name, points, class_id
+    )
+    SELECT json_build_object(
+        'id', u.id,
+        'name', u.name,
+        'points', u.points,
+        'class_id', u.class_id,
+        'class', CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END
+    )
+    FROM updated u
+    LEFT JOIN classes c ON c.id = u.class_id;
+$$;
@@ -0,0 +1,45 @@
+-- Migration: bulk point awards
+--
+-- Adds the `add_student_points_bulk` function used by
+-- StudentService.add_points_bulk. Awards are applied in one set-based UPDATE,
+-- either to every student of a class (p_class_id + p_points) or to a list of
+-- {"student_id": ..., "points": ...} objects (p_awards). Repeated student ids
+-- in the list are summed. Returns a JSON array of the updated students with
+-- their class; unknown student ids are ignored.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE OR REPLACE FUNCTION add_student_points_bulk(
+    p_awards JSONB DEFAULT NULL,
+    p_class_id BIGINT DEFAULT NULL,
+    p_points INT DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE sql
+AS $$
+    WITH awards AS (
+        SELECT (a->>'student_id')::BIGINT AS student_id, SUM((a->>'points')::INT)::INT AS points
+        FROM jsonb_array_elements(COALESCE(p_awards, '[]'::JSONB)) AS a
+        GROUP BY 1
+        UNION ALL
+        SELECT id, p_points
+        FROM students
+        WHERE p_class_id IS NOT NULL AND class_id = p_class_id
+    ),
+    updated AS (
+        UPDATE students s
+        SET points = COALESCE(s.points, 0) + a.points
+        FROM awards a
+        WHERE s.id = a.student_id
+        RETURNING s.id, s.name, s.points, s.class_id
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', u.id,
+        'name', u.name,
+        'points', u.points,
+        'class_id', u.class_id,
+        'class', CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END
+    ) ORDER BY u.points DESC, u.id), '[]'::JSON)
+    FROM updated u
+    LEFT JOIN classes c ON c.id = u.class_id;
+$$;
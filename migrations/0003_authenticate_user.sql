@@ -0,0 +1,33 @@
+-- Migration: single round-trip login
+--
+-- Adds the `authenticate_user` function used by UserService.authenticate_user.
+-- It looks the password up in admins and students in one statement and
+-- returns the matching user as JSON with its role, admin permissions or
+-- student class (the password itself is never returned). Admins take
+-- precedence, as before. Returns NULL when nothing matches.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE OR REPLACE FUNCTION authenticate_user(p_password TEXT)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT user_row
+    FROM (
+        SELECT 1 AS priority,
+               (to_jsonb(a) - 'password' - 'created_at') || jsonb_build_object('role', 'admin') AS user_row
+        FROM admins a
+        WHERE a.password = p_password
+        UNION ALL
+        SELECT 2,
+               (to_jsonb(s) - 'password' - 'created_at') || jsonb_build_object(
+                   'role', 'student',
+                   'class', (SELECT jsonb_build_object('id', c.id, 'name', c.name) FROM classes c WHERE c.id = s.class_id)
+               )
+        FROM students s
+        WHERE s.password = p_password
+    ) matches
+    ORDER BY priority
+    LIMIT 1;
+$$;
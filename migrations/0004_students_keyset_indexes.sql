@@ -0,0 +1,11 @@
+-- Migration: keyset pagination indexes for student listings
+--
+-- Student listings page through students in (points DESC, id) order with a
+-- keyset cursor, optionally filtered by class. These indexes let each page
+-- be read with an index scan that starts at the cursor instead of sorting
+-- the whole table.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE INDEX IF NOT EXISTS students_points_id_idx ON students (points DESC, id);
+CREATE INDEX IF NOT EXISTS students_class_points_id_idx ON students (class_id, points DESC, id);
@@ -0,0 +1,19 @@
+-- Migration: indexes for the remaining hot queries
+--
+-- - content_cards (week_id, id): weeks are read with their cards embedded
+--   and ordered by id. Foreign keys get no index of their own, so without
+--   it every week's cards were a scan of content_cards (and deleting a week
+--   scanned it again for the cascade).
+-- - students.points becomes NOT NULL (it already defaults to 0). Rankings
+--   then never have to place NULLs, so ORDER BY points DESC matches the
+--   students_points_id_idx order from 0004 exactly.
+--
+-- Students filtered by class use students_class_points_id_idx (0004), and
+-- logins use the unique indexes on admins.password and students.password.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE INDEX IF NOT EXISTS content_cards_week_id_id_idx ON content_cards (week_id, id);
+
+UPDATE students SET points = 0 WHERE points IS NULL;
+ALTER TABLE students ALTER COLUMN points SET NOT NULL;
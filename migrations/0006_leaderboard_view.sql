@@ -0,0 +1,23 @@
+-- Migration: ranked leaderboard view
+--
+-- `leaderboard` is every student with their class and their rank by points.
+-- Tied students share a rank (1, 2, 2, 4), like the in-process leaderboard
+-- cache. The rank is computed while walking students_points_id_idx, so no
+-- sort is needed; a page of the leaderboard is
+--
+--     SELECT * FROM leaderboard ORDER BY points DESC, id LIMIT 50;
+--
+-- The view runs with the caller's privileges (security_invoker).
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE OR REPLACE VIEW leaderboard WITH (security_invoker = true) AS
+SELECT
+    s.id,
+    s.name,
+    s.points,
+    s.class_id,
+    CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END AS class,
+    RANK() OVER (ORDER BY s.points DESC) AS rank
+FROM students s
+LEFT JOIN classes c ON c.id = s.class_id;
@@ -0,0 +1,23 @@
+-- Migration: weeks with their cards as JSON
+--
+-- `weeks_with_cards` is every week with its content cards aggregated into a
+-- JSON array ordered by id, the shape served by the weeks endpoints. Each
+-- week's cards are read from content_cards_week_id_id_idx (0005).
+--
+-- The view runs with the caller's privileges (security_invoker).
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+CREATE OR REPLACE VIEW weeks_with_cards WITH (security_invoker = true) AS
+SELECT
+    w.id,
+    w.week_number,
+    w.title,
+    w.video_url,
+    w.is_locked,
+    COALESCE(
+        (SELECT json_agg(json_build_object('id', cc.id, 'week_id', cc.week_id, 'title', cc.title, 'description', cc.description) ORDER BY cc.id)
+         FROM content_cards cc WHERE cc.week_id = w.id),
+        '[]'::json
+    ) AS content_cards
+FROM weeks w;
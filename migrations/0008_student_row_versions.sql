@@ -0,0 +1,98 @@
+-- Migration: student row versions
+--
+-- Adds `students.version`, raised by one on every update of the row
+-- (including class_id being cleared when a class is deleted). Concurrent
+-- updates of a student are serialized by the row lock, so a higher version
+-- is always the newer row. The in-process leaderboard caches use it to keep
+-- the newer copy when write results or invalidation messages arrive out of
+-- order. The points functions and the leaderboard view return it too.
+--
+-- Apply with `python -m app.db.migrate`, or run in the Supabase "SQL Editor".
+
+ALTER TABLE students ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS students_bump_version ON students;
+CREATE TRIGGER students_bump_version
+    BEFORE UPDATE ON students
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE OR REPLACE FUNCTION add_student_points(p_student_id BIGINT, p_points INT)
+RETURNS JSON
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE students
+        SET points = COALESCE(points, 0) + p_points
+        WHERE id = p_student_id
+        RETURNING id, name, points, class_id, version
+    )
+    SELECT json_build_object(
+        'id', u.id,
+        'name', u.name,
+        'points', u.points,
+        'class_id', u.class_id,
+        'class', CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END,
+        'version', u.version
+    )
+    FROM updated u
+    LEFT JOIN classes c ON c.id = u.class_id;
+$$;
+
+CREATE OR REPLACE FUNCTION add_student_points_bulk(
+    p_awards JSONB DEFAULT NULL,
+    p_class_id BIGINT DEFAULT NULL,
+    p_points INT DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE sql
+AS $$
+    WITH awards AS (
+        SELECT (a->>'student_id')::BIGINT AS student_id, SUM((a->>'points')::INT)::INT AS points
+        FROM jsonb_array_elements(COALESCE(p_awards, '[]'::JSONB)) AS a
+        GROUP BY 1
+        UNION ALL
+        SELECT id, p_points
+        FROM students
+        WHERE p_class_id IS NOT NULL AND class_id = p_class_id
+    ),
+    updated AS (
+        UPDATE students s
+        SET points = COALESCE(s.points, 0) + a.points
+        FROM awards a
+        WHERE s.id = a.student_id
+        RETURNING s.id, s.name, s.points, s.class_id, s.version
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', u.id,
+        'name', u.name,
+        'points', u.points,
+        'class_id', u.class_id,
+        'class', CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END,
+        'version', u.version
+    ) ORDER BY u.points DESC, u.id), '[]'::JSON)
+    FROM updated u
+    LEFT JOIN classes c ON c.id = u.class_id;
+$$;
+
+-- New columns can only be added at the end of a view.
+CREATE OR REPLACE VIEW leaderboard WITH (security_invoker = true) AS
+SELECT
+    s.id,
+    s.name,
+    s.points,
+    s.class_id,
+    CASE WHEN c.id IS NULL THEN NULL ELSE json_build_object('id', c.id, 'name', c.name) END AS class,
+    RANK() OVER (ORDER BY s.points DESC) AS rank,
+    s.version
+FROM students s
+LEFT JOIN classes c ON c.id = s.class_id;
@@ -0,0 +1,10 @@
+-- Sample data for a new development database (not a migration).
+--
+-- Run once after the migrations: psql "$DATABASE_URL" -f migrations/sample_data.sql
+
+INSERT INTO classes (name) VALUES ('Class A'), ('Class B');
+INSERT INTO students (password, name, class_id, points) VALUES
+('student123', 'John Doe', 1, 100),
+('student456', 'Jane Smith', 2, 150);
+INSERT INTO weeks (week_number, title, is_locked) VALUES (1, 'The Value of Respect', false);
+INSERT INTO content_cards (week_id, title, description) VALUES (1, 'Respect in Dialogue', 'Always listen to others and value their opinions.');